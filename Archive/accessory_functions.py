@@ -1,54 +1,108 @@
+import numpy as np
 import pandas as pd
+from location_catalog import LIVE, get_catalog
+
+# Single breakpoint table for every AQI classification (upper bound of each band)
+AQI_BREAKPOINTS = np.array([50, 100, 150, 200, 300])
+AQI_CATEGORIES = np.array([
+    "Good",
+    "Moderate",
+    "Unhealthy for Sensitive Groups",
+    "Unhealthy",
+    "Very Unhealthy",
+    "Hazardous",
+])
+AQI_COLORS = np.array([
+    "#00E400",  # Green
+    "#FFFF00",  # Yellow
+    "#FF7E00",  # Orange
+    "#FF0000",  # Red
+    "#8F3F97",  # Purple
+    "#7E0023",  # Maroon
+])
+# Asthma risk tops out at 5 from the "Very Unhealthy" band upwards
+RISK_SCORES = np.array([1, 2, 3, 4, 5, 5])
+RISK_LEVELS = np.array([
+    "Low Risk",
+    "Low-Moderate Risk",
+    "Moderate Risk",
+    "High-Moderate Risk",
+    "High Risk",
+    "High Risk",
+])
+
+# Pollutant level bands are percentages of the safe level
+LEVEL_BREAKPOINTS = np.array([50, 100, 150, 200])
+LEVEL_COLORS = AQI_COLORS[:5]
+
+
+def hex_to_rgb_array(hex_colors):
+    """Convert an array of #RRGGBB strings to an (n, 3) uint8 array."""
+    values = np.array([int(h.lstrip('#'), 16) for h in np.atleast_1d(hex_colors)], dtype=np.uint32)
+    return np.stack([(values >> 16) & 255, (values >> 8) & 255, values & 255], axis=-1).astype(np.uint8)
+
+
+AQI_RGB = hex_to_rgb_array(AQI_COLORS)
+
+
+def aqi_category_codes(aqi_values):
+    """
+    Band index (0 = Good ... 5 = Hazardous) for each AQI value
+    """
+    return np.searchsorted(AQI_BREAKPOINTS, np.asarray(aqi_values, dtype=float), side='left')
+
+
+def classify_aqi(aqi_values):
+    """
+    Vectorized AQI classification.
+    Returns a dict of arrays: code, category, color, risk_score and risk_level.
+    """
+    codes = aqi_category_codes(aqi_values)
+    return {
+        "code": codes,
+        "category": AQI_CATEGORIES[codes],
+        "color": AQI_COLORS[codes],
+        "risk_score": RISK_SCORES[codes],
+        "risk_level": RISK_LEVELS[codes],
+    }
+
+
+def aqi_rgba(aqi_values, alpha=180):
+    """
+    (n, 4) uint8 RGBA array for map layers
+    """
+    rgb = AQI_RGB[aqi_category_codes(aqi_values)]
+    return np.concatenate([rgb, np.full((len(rgb), 1), alpha, dtype=np.uint8)], axis=1)
+
+
+def level_color_codes(values, safe_levels):
+    """
+    Band index of each pollutant value relative to its safe level
+    """
+    percentage = np.asarray(values, dtype=float) / np.asarray(safe_levels, dtype=float) * 100
+    return np.searchsorted(LEVEL_BREAKPOINTS, percentage, side='left')
+
+
 def calculate_asthma_risk_score(aqi):
     """
     Calculate asthma risk score based on AQI
     """
-    if aqi <= 50:
-        return 1, "Low Risk"
-    elif aqi <= 100:
-        return 2, "Low-Moderate Risk"
-    elif aqi <= 150:
-        return 3, "Moderate Risk"
-    elif aqi <= 200:
-        return 4, "High-Moderate Risk"
-    else:
-        return 5, "High Risk"
+    code = aqi_category_codes(aqi)
+    return int(RISK_SCORES[code]), str(RISK_LEVELS[code])
 
 
 def get_aqi_category(aqi):
     """
     Get air quality category based on AQI value
     """
-    if aqi <= 50:
-        return "Good"
-    elif aqi <= 100:
-        return "Moderate"
-    elif aqi <= 150:
-        return "Unhealthy for Sensitive Groups"
-    elif aqi <= 200:
-        return "Unhealthy"
-    elif aqi <= 300:
-        return "Very Unhealthy"
-    else:
-        return "Hazardous"
+    return str(AQI_CATEGORIES[aqi_category_codes(aqi)])
 
 
 def get_aqi_color(aqi):
     """
     Get color for AQI visualization
     """
-    if aqi <= 50:
-        return "#00E400"  # Green
-    elif aqi <= 100:
-        return "#FFFF00"  # Yellow
-    elif aqi <= 150:
-        return "#FF7E00"  # Orange
-    elif aqi <= 200:
-        return "#FF0000"  # Red
-    elif aqi <= 300:
-        return "#8F3F97"  # Purple
-    else:
-        return "#7E0023"  # Maroon
+    return str(AQI_COLORS[aqi_category_codes(aqi)])
     
 def get_pollutant_full_name(code):
     """
@@ -68,25 +122,24 @@ def get_level_color(value, safe_level):
     """
     Get color based on pollutant level compared to safe level
     """
-    percentage = (value / safe_level) * 100
-
-    if percentage <= 50:
-        return "#00E400"  # Green
-    elif percentage <= 100:
-        return "#FFFF00"  # Yellow
-    elif percentage <= 150:
-        return "#FF7E00"  # Orange
-    elif percentage <= 200:
-        return "#FF0000"  # Red
-    else:
-        return "#8F3F97"  # Purple
+    return str(LEVEL_COLORS[level_color_codes(value, safe_level)])
     
 
 def getting_locations():
-    locations = pd.read_csv("cities_with_lat_lon.csv").drop(columns=['Unnamed: 0'])
-    state_cities_coord = locations.groupby('State').apply(lambda x: x.set_index('City').to_dict(orient='index'), include_groups=False).to_dict()
-    states = locations['State'].unique().tolist()
-    state_cities = locations.groupby('State')['City'].apply(list).to_dict()
+    """
+    Live-monitoring cities from the location catalogue as
+    (state -> city -> coordinates, states, state -> cities)
+    """
+    catalog = get_catalog()
+    state_cities_coord, state_cities = {}, {}
+    states = catalog.state_names(LIVE)
+    for state in states:
+        ids = catalog.city_ids(state, LIVE)
+        state_cities[state] = [catalog.names[i] for i in ids]
+        state_cities_coord[state] = {
+            catalog.names[i]: {'Latitude': float(catalog.lat[i]), 'Longitude': float(catalog.lng[i])}
+            for i in ids
+        }
     return state_cities_coord,states,state_cities
 
 def hex_to_rgb(hex_color):
@@ -0,0 +1,185 @@
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Grid cell size in degrees (~5.5 km at Malaysian latitudes)
+CELL_SIZE = 0.05
+
+# IQAir and OpenWeather both refresh their readings hourly
+TTL_SECONDS = 60 * 60
+
+# Bound on the shared on-disk store and on the per-process front cache
+MAX_ENTRIES = 5000
+MEMORY_ENTRIES = 1024
+
+# Fetches for one cell are serialised on one of these locks, picked by hashing the cell
+LOCK_STRIPES = 64
+
+CACHE_PATH = os.environ.get(
+    "AQI_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "aqi_cache.sqlite")
+)
+
+
+def cell_key(lat, lng, cell_size=CELL_SIZE):
+    """
+    Bucket a coordinate into its grid cell so nearby fixes share one entry
+    """
+    return f"{math.floor(float(lat) / cell_size)}:{math.floor(float(lng) / cell_size)}"
+
+
+class AQICache:
+    """
+    Two-level cache for live readings keyed by grid cell.
+    The front level is an in-process LRU dict, the back level is a SQLite
+    file shared by every Streamlit server process on the host. Both levels
+    expire entries after `ttl` seconds and evict least recently used cells.
+    """
+    def __init__(self, path=CACHE_PATH, ttl=TTL_SECONDS, max_entries=MAX_ENTRIES,
+                 memory_entries=MEMORY_ENTRIES, cell_size=CELL_SIZE):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.cell_size = cell_size
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        # a fixed pool, so every caller for a cell always finds the same lock
+        self._cell_locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS readings (
+                    cell TEXT PRIMARY KEY,
+                    lat REAL,
+                    lng REAL,
+                    aqi TEXT,
+                    components TEXT,
+                    fetched_at REAL,
+                    accessed_at REAL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS readings_accessed ON readings (accessed_at)")
+
+    def _connect(self):
+        # one connection per thread, WAL lets several processes read while one writes
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, lat, lng):
+        """
+        Return (aqi, components, fetched_at) for the cell or None when missing/expired
+        """
+        key = cell_key(lat, lng, self.cell_size)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if now - entry[2] < self.ttl:
+                    self._memory.move_to_end(key)
+                    return entry
+                del self._memory[key]
+
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT aqi, components, fetched_at FROM readings WHERE cell = ?", (key,)
+        ).fetchone()
+        if row is None or now - row[2] >= self.ttl:
+            return None
+        conn.execute("UPDATE readings SET accessed_at = ? WHERE cell = ?", (now, key))
+        entry = (json.loads(row[0]), json.loads(row[1]), row[2])
+        self._remember(key, entry)
+        return entry
+
+    def put(self, lat, lng, aqi, components, fetched_at=None):
+        key = cell_key(lat, lng, self.cell_size)
+        fetched_at = fetched_at or time.time()
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO readings VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (key, lat, lng, json.dumps(aqi), json.dumps(components), fetched_at, fetched_at),
+        )
+        self._remember(key, (aqi, components, fetched_at))
+        self._evict(conn)
+
+    def get_or_fetch(self, lat, lng, fetch, is_error=None):
+        """
+        Serve the cell from cache, otherwise call fetch(lat, lng) once per cell.
+        Results for which is_error(...) is true are returned but not stored.
+        """
+        entry = self.get(lat, lng)
+        if entry is not None:
+            return entry[0], entry[1]
+
+        key = cell_key(lat, lng, self.cell_size)
+        cell_lock = self._cell_locks[hash(key) % len(self._cell_locks)]
+        with cell_lock:
+            # another thread may have filled the cell while we waited
+            entry = self.get(lat, lng)
+            if entry is not None:
+                return entry[0], entry[1]
+            aqi, components = fetch(lat, lng)
+            if is_error is None or not (is_error(aqi) or is_error(components)):
+                self.put(lat, lng, aqi, components)
+        return aqi, components
+
+    def readings(self):
+        """
+        All unexpired readings as a list of dicts with lat/lng, aqi, components, fetched_at
+        """
+        cutoff = time.time() - self.ttl
+        rows = self._connect().execute(
+            "SELECT lat, lng, aqi, components, fetched_at FROM readings WHERE fetched_at > ?",
+            (cutoff,),
+        ).fetchall()
+        return [
+            {"lat": lat, "lng": lng, "aqi": json.loads(aqi),
+             "components": json.loads(components), "fetched_at": fetched_at}
+            for lat, lng, aqi, components, fetched_at in rows
+        ]
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        self._connect().execute("DELETE FROM readings")
+
+    def _remember(self, key, entry):
+        with self._lock:
+            self._memory[key] = entry
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def _evict(self, conn):
+        conn.execute("DELETE FROM readings WHERE fetched_at <= ?", (time.time() - self.ttl,))
+        conn.execute(
+            """
+            DELETE FROM readings WHERE cell IN (
+                SELECT cell FROM readings ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+            )
+            """,
+            (self.max_entries,),
+        )
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_cache():
+    """
+    Process-wide cache instance, created on first use
+    """
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = AQICache()
+        return _default_cache
@@ -0,0 +1,90 @@
+import numpy as np
+
+# US EPA AQI breakpoints: (concentration low, concentration high, index low, index high).
+# PM in ug/m3, O3/NO2/SO2 in ppb, CO in ppm. O3 uses the 8-hour table up to
+# 200 ppb; above that only the 1-hour table applies: its 205-404 ppb band ends
+# at 300, which the 8-hour table has already reached, then 405-504 ppb is
+# 301-400 and 505-604 ppb is 401-500.
+BREAKPOINTS = {
+    "pm2_5": [(0.0, 9.0, 0, 50), (9.1, 35.4, 51, 100), (35.5, 55.4, 101, 150),
+              (55.5, 125.4, 151, 200), (125.5, 225.4, 201, 300), (225.5, 325.4, 301, 500)],
+    "pm10": [(0, 54, 0, 50), (55, 154, 51, 100), (155, 254, 101, 150),
+             (255, 354, 151, 200), (355, 424, 201, 300), (425, 604, 301, 500)],
+    "o3": [(0, 54, 0, 50), (55, 70, 51, 100), (71, 85, 101, 150),
+           (86, 105, 151, 200), (106, 200, 201, 300), (201, 404, 300, 300),
+           (405, 504, 301, 400), (505, 604, 401, 500)],
+    "no2": [(0, 53, 0, 50), (54, 100, 51, 100), (101, 360, 101, 150),
+            (361, 649, 151, 200), (650, 1249, 201, 300), (1250, 2049, 301, 500)],
+    "so2": [(0, 35, 0, 50), (36, 75, 51, 100), (76, 185, 101, 150),
+            (186, 304, 151, 200), (305, 604, 201, 300), (605, 1004, 301, 500)],
+    "co": [(0.0, 4.4, 0, 50), (4.5, 9.4, 51, 100), (9.5, 12.4, 101, 150),
+           (12.5, 15.4, 151, 200), (15.5, 30.4, 201, 300), (30.5, 50.4, 301, 500)],
+}
+
+# Decimal places each concentration is truncated to before lookup
+PRECISION = {"pm2_5": 1, "pm10": 0, "o3": 0, "no2": 0, "so2": 0, "co": 1}
+
+# OpenWeather reports every gas in ug/m3; convert at 25 degC / 1 atm
+MOLAR_VOLUME = 24.45
+UGM3_TO_UNIT = {
+    "pm2_5": 1.0,
+    "pm10": 1.0,
+    "o3": MOLAR_VOLUME / 48.00,
+    "no2": MOLAR_VOLUME / 46.01,
+    "so2": MOLAR_VOLUME / 64.07,
+    "co": MOLAR_VOLUME / 28.01 / 1000,
+}
+
+# Pollutant codes as used by IQAir's `mainus` field
+IQAIR_CODES = {"pm2_5": "p2", "pm10": "p1", "o3": "o3", "no2": "n2", "so2": "s2", "co": "co"}
+
+POLLUTANTS = list(BREAKPOINTS)
+_TABLES = {p: np.array(rows, dtype=float) for p, rows in BREAKPOINTS.items()}
+
+
+def sub_index(pollutant, concentration_ugm3):
+    """
+    EPA sub-index for one pollutant over an array of OpenWeather concentrations.
+    Missing or negative readings give NaN; readings above the top band give 500.
+    """
+    table = _TABLES[pollutant]
+    scale = 10 ** PRECISION[pollutant]
+    conc = np.asarray(concentration_ugm3, dtype=float) * UGM3_TO_UNIT[pollutant]
+    conc = np.floor(conc * scale + 1e-9) / scale
+    band = np.minimum(np.searchsorted(table[:, 1], conc, side="left"), len(table) - 1)
+    c_lo, c_hi, i_lo, i_hi = table[band].T
+    index = (i_hi - i_lo) / (c_hi - c_lo) * (conc - c_lo) + i_lo
+    index = np.where(conc > table[-1, 1], 500, index)
+    return np.where(conc >= 0, np.round(index), np.nan)
+
+
+def compute_aqi(components):
+    """
+    Vectorized US AQI from OpenWeather `components`.
+    `components` is a dict (or DataFrame) of pollutant -> scalar or array.
+    Returns a dict with `aqi` (float array), `main_pollutant` (IQAir codes,
+    None where there is no AQI) and `sub_indices` per pollutant.
+    """
+    available = [p for p in POLLUTANTS if p in components]
+    if not available:
+        raise ValueError("components contain none of " + ", ".join(POLLUTANTS))
+    subs = {p: np.atleast_1d(sub_index(p, components[p])) for p in available}
+    stacked = np.vstack(np.broadcast_arrays(*subs.values()))
+    filled = np.where(np.isnan(stacked), -1, stacked)
+    dominant = filled.argmax(axis=0)
+    aqi = filled.max(axis=0)
+    aqi = np.where(aqi < 0, np.nan, aqi)
+    codes = np.array([IQAIR_CODES[p] for p in available], dtype=object)
+    main_pollutant = np.where(np.isnan(aqi), None, codes[dominant])
+    return {"aqi": aqi, "main_pollutant": main_pollutant, "sub_indices": subs}
+
+
+def aqi_from_components(components):
+    """
+    Scalar convenience wrapper: (aqi, main_pollutant code) for one reading
+    """
+    result = compute_aqi(components)
+    aqi = result["aqi"][0]
+    if np.isnan(aqi):
+        return None, None
+    return int(aqi), str(result["main_pollutant"][0])
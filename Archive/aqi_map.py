@@ -1,48 +1,235 @@
-import streamlit as st
-import pydeck as pdk
+import base64
+import io
+import os
+
+import numpy as np
 import pandas as pd
-from accessory_functions import get_aqi_color,hex_to_rgb
+import pydeck as pdk
+import streamlit as st
+from PIL import Image
+
+from accessory_functions import LEVEL_COLORS, aqi_rgba, hex_to_rgb_array, level_color_codes
+from aqi_cache import get_cache
+from educational_insight import POLLUTANT_INFO
+from spatial_index import haversine_km
+
+# Basemap: streamlit's token-free "light" style by default; AQI_MAP_STYLE=none
+# draws the layers without any basemap tiles (fully offline)
+MAP_STYLE = os.environ.get("AQI_MAP_STYLE", "light")
+
+# Marker for the selected location, inlined so no icon is fetched per render
+MARKER_SVG = (
+    '<svg xmlns="http://www.w3.org/2000/svg" width="128" height="128" viewBox="0 0 128 128">'
+    '<path d="M64 4C40 4 22 22 22 46c0 32 42 78 42 78s42-46 42-78C106 22 88 4 64 4z" '
+    'fill="#d62728" stroke="#ffffff" stroke-width="6"/><circle cx="64" cy="46" r="16" fill="#ffffff"/></svg>'
+)
+MARKER_ICON = {
+    "url": "data:image/svg+xml;base64," + base64.b64encode(MARKER_SVG.encode()).decode(),
+    "width": 128,
+    "height": 128,
+    "anchorY": 128,
+}
+
+# Point radius in metres grows with AQI between these bounds
+MIN_RADIUS = 3000
+MAX_RADIUS = 12000
+POINT_ALPHA = 180
+
+# Interpolation grid over Malaysia (Peninsular and East), in degrees
+GRID_LAT = (0.8, 7.6)
+GRID_LNG = (99.5, 119.5)
+GRID_STEP = 0.1
+# Inverse-distance weighting: weight = 1 / distance^power, stations further
+# than the radius do not contribute and cells with none in range stay blank
+IDW_POWER = 2
+IDW_RADIUS_KM = 150
+SURFACE_ALPHA = 150
+POLLUTANTS = list(POLLUTANT_INFO)
+LEVEL_RGB = hex_to_rgb_array(LEVEL_COLORS)
+
+
+def _map_style():
+    return None if MAP_STYLE == "none" else MAP_STYLE
+
+
+def readings_columns(readings):
+    """
+    Columnar arrays for the nationwide layer: position, AQI, RGB colour and
+    radius, all computed for every reading at once. Only flat scalar columns
+    with short names: st.pydeck_chart sends the layer data as row-wise JSON
+    (pydeck's binary transport only works in Jupyter).
+    """
+    readings = [r for r in readings if isinstance(r["aqi"], dict) and r["aqi"].get("aqi") is not None]
+    aqi = np.array([r["aqi"]["aqi"] for r in readings], dtype=np.float32)
+    rgba = aqi_rgba(aqi, POINT_ALPHA)
+    return pd.DataFrame({
+        # ~10 m precision keeps the JSON sent to the browser small
+        "lng": np.round(np.array([r["lng"] for r in readings], dtype=np.float64), 4),
+        "lat": np.round(np.array([r["lat"] for r in readings], dtype=np.float64), 4),
+        "aqi": aqi.astype(np.int16),
+        "city": [r["aqi"].get("city", "") for r in readings],
+        "r": rgba[:, 0], "g": rgba[:, 1], "b": rgba[:, 2],
+        "radius": (MIN_RADIUS + np.clip(aqi, 0, 300) / 300 * (MAX_RADIUS - MIN_RADIUS)).astype(np.int32),
+    })
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def cached_readings_columns():
+    """Nationwide layer data, rebuilt at most once a minute from the shared cache."""
+    return readings_columns(get_cache().readings())
+
+
+def nationwide_layer(data):
+    return pdk.Layer(
+        "ScatterplotLayer",
+        data=data,
+        get_position=["lng", "lat"],
+        get_fill_color=f"[r, g, b, {POINT_ALPHA}]",
+        get_radius="radius",
+        radius_min_pixels=3,
+        stroked=False,
+        pickable=True,
+    )
+
+
 def display_aqi_map(location, aqi_data):
     lat, lng = location
     aqi_value = aqi_data['aqi']
-    color = get_aqi_color(aqi_value)
-    color = hex_to_rgb(color)
-    
-    map_layer = pdk.Layer(
+
+    selected_layer = pdk.Layer(
         "IconLayer",
         data=pd.DataFrame({
             "lat": [lat],
             "lon": [lng],
             "aqi": [aqi_value],
-            "icon_data": [
-                {
-                    "url": "https://upload.wikimedia.org/wikipedia/commons/e/ec/RedDot.svg", 
-                    "width": 128,
-                    "height": 128,
-                    "anchorY": 128
-                }
-            ]
+            "city": [aqi_data.get('city', '')],
+            "icon_data": [MARKER_ICON],
         }),
         get_position=["lon", "lat"],
         get_icon="icon_data",
         get_size=20,
         pickable=True,
     )
-    
+
     view_state = pdk.ViewState(
         latitude=lat,
         longitude=lng,
         zoom=10,
         pitch=0,
     )
-    
+
     st.pydeck_chart(pdk.Deck(
-        map_style="mapbox://styles/mapbox/light-v9",
+        map_style=_map_style(),
         initial_view_state=view_state,
-        layers=[map_layer],
+        layers=[nationwide_layer(cached_readings_columns()), selected_layer],
         tooltip={
-            "html": "<b>AQI:</b> {aqi}",
+            "html": "<b>{city}</b><br/><b>AQI:</b> {aqi}",
             "style": {"backgroundColor": "steelblue", "color": "white"}
         }
     ))
 
+
+def grid_axes():
+    lats = np.arange(GRID_LAT[0], GRID_LAT[1] + GRID_STEP / 2, GRID_STEP)
+    lngs = np.arange(GRID_LNG[0], GRID_LNG[1] + GRID_STEP / 2, GRID_STEP)
+    return lats, lngs
+
+
+def component_stations(readings):
+    """
+    Station coordinates and an (n, pollutants) value matrix, NaN where a
+    reading lacks a pollutant
+    """
+    readings = [r for r in readings if isinstance(r["components"], dict) and "error" not in r["components"]]
+    lat = np.array([r["lat"] for r in readings], dtype=np.float64)
+    lng = np.array([r["lng"] for r in readings], dtype=np.float64)
+    values = np.array(
+        [[r["components"].get(key, np.nan) for key in POLLUTANTS] for r in readings], dtype=np.float64
+    ).reshape(len(readings), len(POLLUTANTS))
+    return lat, lng, values
+
+
+def idw_grid(station_lat, station_lng, values, lats, lngs, power=IDW_POWER, radius_km=IDW_RADIUS_KM):
+    """
+    Interpolate every pollutant onto the lats x lngs grid in one pass.
+    Returns a (len(lats), len(lngs), pollutants) array, NaN where no station is in range.
+    """
+    grid_lat, grid_lng = np.meshgrid(lats, lngs, indexing="ij")
+    distance = haversine_km(grid_lat.ravel()[:, None], grid_lng.ravel()[:, None], station_lat, station_lng)
+    # a station sitting on a cell centre would divide by zero
+    weights = np.where(distance <= radius_km, 1.0 / np.maximum(distance, 1.0) ** power, 0.0)
+    present = ~np.isnan(values)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        surface = (weights @ np.where(present, values, 0.0)) / (weights @ present)
+    return surface.reshape(len(lats), len(lngs), values.shape[1]).astype(np.float32)
+
+
+def surface_png(surface, safe_level):
+    """
+    Data-URI PNG of one pollutant surface coloured by level against its safe level
+    """
+    rgba = np.zeros(surface.shape + (4,), dtype=np.uint8)
+    known = ~np.isnan(surface)
+    rgba[known, :3] = LEVEL_RGB[level_color_codes(surface[known], safe_level)]
+    rgba[known, 3] = SURFACE_ALPHA
+    # row 0 of the image is the northern edge
+    buffer = io.BytesIO()
+    Image.fromarray(rgba[::-1], "RGBA").save(buffer, format="PNG", optimize=True)
+    return "data:image/png;base64," + base64.b64encode(buffer.getvalue()).decode()
+
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def cached_surfaces(stamp, _station_lat, _station_lng, _values):
+    """All pollutant surfaces for one set of readings; `stamp` identifies the set."""
+    lats, lngs = grid_axes()
+    return idw_grid(_station_lat, _station_lng, _values, lats, lngs)
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def cached_surface_png(stamp, pollutant, _surfaces):
+    return surface_png(_surfaces[:, :, POLLUTANTS.index(pollutant)], POLLUTANT_INFO[pollutant]["safe_level"])
+
+
+def display_heatmap(location, components):
+    lat, lng = location
+    readings = get_cache().readings()
+    if components and not any(r["lat"] == lat and r["lng"] == lng for r in readings):
+        readings.append({"lat": lat, "lng": lng, "components": components, "fetched_at": 0})
+    station_lat, station_lng, values = component_stations(readings)
+    if len(values) == 0:
+        st.info("No pollutant readings available yet.")
+        return
+
+    # the newest reading time and the count identify a set of cached readings
+    stamp = (len(readings), max(r["fetched_at"] for r in readings), lat, lng)
+    surfaces = cached_surfaces(stamp, station_lat, station_lng, values)
+
+    pollutant = st.selectbox(
+        "Pollutant", POLLUTANTS, index=POLLUTANTS.index("pm2_5"),
+        format_func=lambda key: POLLUTANT_INFO[key]["name"],
+    )
+    surface_layer = pdk.Layer(
+        "BitmapLayer",
+        image=cached_surface_png(stamp, pollutant, surfaces),
+        bounds=[round(edge, 4) for edge in (GRID_LNG[0] - GRID_STEP / 2, GRID_LAT[0] - GRID_STEP / 2,
+                                            GRID_LNG[1] + GRID_STEP / 2, GRID_LAT[1] + GRID_STEP / 2)],
+    )
+    stations_layer = pdk.Layer(
+        "ScatterplotLayer",
+        data=pd.DataFrame({"lng": np.round(station_lng, 4), "lat": np.round(station_lat, 4)}),
+        get_position=["lng", "lat"],
+        get_fill_color=[40, 40, 40, 200],
+        get_radius=1500,
+        radius_min_pixels=2,
+    )
+
+    st.pydeck_chart(pdk.Deck(
+        map_style=_map_style(),
+        initial_view_state=pdk.ViewState(latitude=lat, longitude=lng, zoom=6, pitch=0),
+        layers=[surface_layer, stations_layer],
+    ))
+    st.caption(
+        f"{POLLUTANT_INFO[pollutant]['name']} interpolated from {len(values)} readings "
+        f"(inverse-distance weighting within {IDW_RADIUS_KM} km); colours compare levels "
+        f"with the safe level of {POLLUTANT_INFO[pollutant]['safe_level']} {POLLUTANT_INFO[pollutant]['unit']}."
+    )
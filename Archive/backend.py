@@ -1,19 +1,367 @@
+import itertools
+import os
+import threading
+import time
 import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout, wait, FIRST_COMPLETED
+from aqi_cache import get_cache
+from aqi_engine import aqi_from_components
+from spatial_index import get_city_index
 #from API.api_key import iqair_key,open_weather
 #from geopy.geocoders import Nominatim
 
-def aqi_and_components(lat,lng):
-    aqi = getting_aqi(lat,lng)
-    components = getting_components(lat,lng)
-    return aqi,components
+# Provider endpoints; point these at mock_provider.py for offline runs
+PUBLIC_IQAIR_URL = "http://api.airvisual.com"
+PUBLIC_OPENWEATHER_URL = "http://api.openweathermap.org"
+IQAIR_BASE_URL = os.environ.get("IQAIR_BASE_URL", PUBLIC_IQAIR_URL)
+OPENWEATHER_BASE_URL = os.environ.get("OPENWEATHER_BASE_URL", PUBLIC_OPENWEATHER_URL)
+# API keys come only from the environment; the mock provider needs none
+IQAIR_KEY = os.environ.get("IQAIR_KEY")
+OPENWEATHER_KEY = os.environ.get("OPENWEATHER_KEY")
 
-def getting_aqi(lat,lng):
-    iqair_url = f"http://api.airvisual.com/v2/nearest_city?lat={lat}&lon={lng}&key=3f8d1e2f-379b-4746-a35f-de2b48ba8d2c"
+# "both" asks IQAir for the AQI; "openweather" computes it locally from the
+# OpenWeather components (one upstream call), optionally cross-checked with IQAir
+PROVIDER_MODE = os.environ.get("AQI_PROVIDER_MODE", "both")
+IQAIR_CROSS_CHECK = os.environ.get("AQI_IQAIR_CROSS_CHECK", "0") == "1"
+
+# Per-call deadlines (seconds) for each upstream provider; REQUEST_TIMEOUT
+# bounds a whole call, retries included
+CONNECT_TIMEOUT = 3.05
+REQUEST_TIMEOUT = 10
+
+# Connection pool of the shared HTTP session and the retry policy of ProviderClient
+POOL_SIZE = 16
+MAX_RETRIES = 2
+RETRY_BACKOFF = 0.3
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# A provider is skipped for BREAKER_RESET seconds after BREAKER_THRESHOLD consecutive failures
+BREAKER_THRESHOLD = 5
+BREAKER_RESET = 30
+
+# Provider quotas in calls per minute (IQAir Community: 5/min, OpenWeather free:
+# 60/min), shared by every caller in the process; the limiters work per second
+IQAIR_CALLS_PER_MINUTE = float(os.environ.get("IQAIR_CALLS_PER_MINUTE", "5"))
+OPENWEATHER_CALLS_PER_MINUTE = float(os.environ.get("OPENWEATHER_CALLS_PER_MINUTE", "60"))
+IQAIR_RATE_LIMIT = IQAIR_CALLS_PER_MINUTE / 60
+OPENWEATHER_RATE_LIMIT = OPENWEATHER_CALLS_PER_MINUTE / 60
+
+# Shared pool so both providers are queried at the same time
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="aqi-fetch")
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket allowing `rate` calls per second
+    """
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst or max(1, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, timeout=None):
+        """
+        Take one token, waiting for it; False, without taking one, when it
+        would not be available within `timeout` seconds
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait_for = (1 - self.tokens) / self.rate
+            if deadline is not None and now + wait_for > deadline:
+                return False
+            time.sleep(wait_for)
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Fail fast while a provider is down.
+    Opens after `threshold` consecutive failures, then lets a single trial
+    call through once `reset_timeout` seconds have passed.
+    """
+    def __init__(self, threshold=BREAKER_THRESHOLD, reset_timeout=BREAKER_RESET):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+        self.lock = threading.Lock()
+
+    def before_call(self):
+        with self.lock:
+            if self.opened_at is None:
+                return
+            if time.monotonic() - self.opened_at < self.reset_timeout or self.trial_running:
+                raise CircuitOpenError()
+            self.trial_running = True
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_running = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trial_running = False
+            if self.failures >= self.threshold or self.opened_at is not None:
+                self.opened_at = time.monotonic()
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+
+
+def _build_session():
+    # no transport-level retries: ProviderClient retries within its deadline
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_SIZE, max_retries=0)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def _retry_delay(response, attempt):
+    """
+    Seconds to wait before the next attempt: the provider's Retry-After when
+    given in seconds, otherwise exponential backoff
+    """
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after is not None and retry_after.strip().isdigit():
+        return float(retry_after)
+    return RETRY_BACKOFF * (2 ** attempt)
+
+
+class ProviderClient:
+    """
+    Pooled keep-alive client for one upstream provider with its quota and breaker.
+    Every attempt, retries included, takes a quota token and is recorded by the
+    breaker, and all attempts share the caller's deadline.
+    """
+    def __init__(self, name, session, rate_limit):
+        self.name = name
+        self.session = session
+        self.limiter = RateLimiter(rate_limit)
+        self.breaker = CircuitBreaker()
+
+    def get(self, url, timeout=REQUEST_TIMEOUT):
+        deadline = time.monotonic() + timeout
+        for attempt in range(MAX_RETRIES + 1):
+            # running out of quota is not a provider failure, so the breaker never sees it
+            if not self.limiter.acquire(deadline - time.monotonic()):
+                raise requests.exceptions.Timeout(f"{self.name}: call quota exhausted until the deadline")
+            self.breaker.before_call()
+            failed, error = True, None
+            try:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise requests.exceptions.Timeout(f"{self.name}: deadline of {timeout}s exceeded")
+                response = self.session.get(url, timeout=(min(CONNECT_TIMEOUT, remaining), remaining))
+                failed = response.status_code in RETRY_STATUSES
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                response, error = None, e
+                if attempt == MAX_RETRIES:
+                    raise
+            finally:
+                # also clears a half-open trial when the call raised anything else
+                if failed:
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success()
+            if not failed:
+                return response
+            delay = _retry_delay(response, attempt)
+            if attempt == MAX_RETRIES or time.monotonic() + delay >= deadline:
+                if error is not None:
+                    raise error
+                return response
+            time.sleep(delay)
+
+
+_session = _build_session()
+_providers = {
+    "iqair": ProviderClient("iqair", _session, IQAIR_RATE_LIMIT),
+    "openweather": ProviderClient("openweather", _session, OPENWEATHER_RATE_LIMIT),
+}
+
+def _api_key(key, base_url, public_url):
+    """
+    The configured key, a placeholder for a mock endpoint, or None when the
+    real provider is configured without one
+    """
+    if key:
+        return key
+    return None if base_url == public_url else "mock"
+
+def _missing_key(provider, variable):
+    return {"error":f"🔑 {provider} API key is not configured (set {variable})."}
+
+def _error_message(response):
+    try:
+        body = response.json()
+        # OpenWeather puts the message at the top level, IQAir under "data"
+        return body.get('message') or (body.get('data') or {}).get('message', 'Unknown Error')
+    except (ValueError, AttributeError):
+        return 'Unknown Error'
+
+def aqi_and_components(lat,lng,timeout=REQUEST_TIMEOUT):
+    """
+    Fetch AQI and pollutant components concurrently.
+    Each side has its own deadline; if one fails or times out the other
+    result is still returned and the failed side holds an error dict.
+    """
+    aqi_future = _executor.submit(getting_aqi,lat,lng,timeout) if _uses_iqair() else None
+    components_future = _executor.submit(getting_components,lat,lng,timeout)
+    aqi = _collect(aqi_future,timeout) if aqi_future else None
+    components = _collect(components_future,timeout)
+    return _combine(lat,lng,aqi,components),components
+
+def _uses_iqair(mode=None):
+    # the IQAir cross-check belongs to the configured mode, not to explicit overrides
+    if mode is not None:
+        return mode != "openweather"
+    return PROVIDER_MODE != "openweather" or IQAIR_CROSS_CHECK
+
+def _combine(lat,lng,aqi,components,mode=None):
+    """
+    In single-provider mode replace the IQAir reading by one computed from the components
+    """
+    if (mode or PROVIDER_MODE) != "openweather":
+        return aqi
+    local = local_aqi(lat,lng,components)
+    if aqi is not None and not is_error(local):
+        local['iqair_aqi'] = None if is_error(aqi) else aqi['aqi']
+    return local
+
+def local_aqi(lat,lng,components):
+    """
+    IQAir-shaped reading computed from OpenWeather components with the EPA tables.
+    City and state come from the nearest known city; weather is not available.
+    """
+    if is_error(components):
+        return components
+    aqi, main_pollutant = aqi_from_components(components)
+    if aqi is None:
+        return {"error":"⚠️ No air quality data available for this location."}
+    nearest = get_city_index().nearest(lat,lng)
+    city = nearest.iloc[0] if not nearest.empty else {"City":"Unknown","State":"Unknown"}
+    return {
+        'city':city['City'],
+        'state':city['State'],
+        'aqi':aqi,
+        'main_pollutant':main_pollutant,
+        'weather':{},
+        'source':'openweather'
+    }
+
+def cached_aqi_and_components(lat,lng):
+    """
+    aqi_and_components served from the shared grid-cell cache.
+    Nearby coordinates share one entry, entries expire after the provider
+    update interval and failed lookups are never cached.
+    """
+    return get_cache().get_or_fetch(lat,lng,aqi_and_components,is_error)
+
+def _collect(future,timeout):
     try:
+        # the provider call, retries included, ends by its deadline; the extra
+        # second covers JSON parsing
+        return future.result(timeout=timeout + 1)
+    except FutureTimeout:
+        future.cancel()
+        return {"error":"⏳ Request timed out. Please try again."}
+    except Exception as e:
+        return {"error":f"🚨 Unexpected Error: {str(e)}"}
+
+def is_error(result):
+    """
+    True when a provider result is missing or an error payload
+    """
+    return not isinstance(result,dict) or "error" in result
 
-        response = requests.get(iqair_url)
+def _location_coords(location):
+    """
+    Accept a (lat, lng) pair or a row/dict with Latitude/Longitude (or lat/lng) keys
+    """
+    if isinstance(location, (tuple, list)):
+        return location[0], location[1]
+    if "Latitude" in location:
+        return location["Latitude"], location["Longitude"]
+    return location["lat"], location["lng"]
+
+def fetch_many(locations,max_concurrency=8,rate_limit=None,timeout=REQUEST_TIMEOUT,mode=None):
+    """
+    Fetch AQI and components for many locations through a bounded pool.
+    `locations` can be a DataFrame (e.g. cities_with_lat_lon.csv) or any
+    iterable of coordinates. At most `max_concurrency` provider calls are in
+    flight, `rate_limit` optionally caps locations started per second on top
+    of the shared provider quotas. `mode` overrides PROVIDER_MODE for this batch.
+    Yields (location, aqi, components) as each location completes.
+    """
+    if hasattr(locations, "to_dict"):
+        locations = locations.to_dict(orient="records")
+    limiter = RateLimiter(rate_limit) if rate_limit else None
+    pending = iter(locations)
+    keys = itertools.count()
+    partial = {}
+    in_flight = {}
+    with ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="aqi-bulk") as pool:
+        def submit_next():
+            location = next(pending, None)
+            if location is None:
+                return False
+            if limiter:
+                limiter.acquire()
+            lat, lng = _location_coords(location)
+            key = next(keys)
+            # slot 1 stays False when only OpenWeather is queried
+            partial[key] = [location, None if _uses_iqair(mode) else False, None]
+            if _uses_iqair(mode):
+                in_flight[pool.submit(getting_aqi, lat, lng, timeout)] = (key, 1)
+            in_flight[pool.submit(getting_components, lat, lng, timeout)] = (key, 2)
+            return True
+
+        # keep each worker busy with one provider call per slot
+        for _ in range(max(1, max_concurrency // 2)):
+            if not submit_next():
+                break
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                key, slot = in_flight.pop(future)
+                try:
+                    partial[key][slot] = future.result()
+                except Exception as e:
+                    partial[key][slot] = {"error":f"🚨 Unexpected Error: {str(e)}"}
+                if partial[key][1] is not None and partial[key][2] is not None:
+                    location, aqi, components = partial.pop(key)
+                    submit_next()
+                    lat, lng = _location_coords(location)
+                    yield location, _combine(lat, lng, aqi or None, components, mode), components
+
+def getting_aqi(lat,lng,timeout=REQUEST_TIMEOUT):
+    key = _api_key(IQAIR_KEY, IQAIR_BASE_URL, PUBLIC_IQAIR_URL)
+    if key is None:
+        return _missing_key("IQAir", "IQAIR_KEY")
+    iqair_url = f"{IQAIR_BASE_URL}/v2/nearest_city?lat={lat}&lon={lng}&key={key}"
+    try:
+        response = _providers["iqair"].get(iqair_url,timeout)
         if response.status_code != 200:
-            return {"error":f"❌ API Error {response.status_code}:{response.json().get('message', 'Unknown Error')}"}
+            return {"error":f"❌ API Error {response.status_code}:{_error_message(response)}"}
         data = response.json()
 
         if not data['data']:
@@ -31,26 +379,31 @@ def getting_aqi(lat,lng):
             'main_pollutant':main_pollutant,
             'weather':weather
         }
-    except requests.exceptions.RequestException as e:
-        return {"error":f"🚨 Network Error: {str(e)}"}
-    
+    except CircuitOpenError:
+        return {"error":"🚧 Air quality provider is unavailable. Please try again shortly."}
     except requests.exceptions.Timeout:
         return {"error":"⏳ Request timed out. Please try again."}
+    except requests.exceptions.RequestException as e:
+        return {"error":f"🚨 Network Error: {str(e)}"}
 
-def getting_components(lat,lng):
+def getting_components(lat,lng,timeout=REQUEST_TIMEOUT):
+    key = _api_key(OPENWEATHER_KEY, OPENWEATHER_BASE_URL, PUBLIC_OPENWEATHER_URL)
+    if key is None:
+        return _missing_key("OpenWeather", "OPENWEATHER_KEY")
     try:
-        openweather_url = f"http://api.openweathermap.org/data/2.5/air_pollution?lat={lat}&lon={lng}&appid=bdb7679f0e611d60b4d22710ba38f3f1"
-        response = requests.get(openweather_url)
+        openweather_url = f"{OPENWEATHER_BASE_URL}/data/2.5/air_pollution?lat={lat}&lon={lng}&appid={key}"
+        response = _providers["openweather"].get(openweather_url,timeout)
         if response.status_code != 200:
-            return {"error":f"❌ API Error {response.status_code}:{response.json().get('message', 'Unknown Error')}"}
+            return {"error":f"❌ API Error {response.status_code}:{_error_message(response)}"}
         data = response.json()
 
         if not data['list']:
             return "⚠️ No air quality data available for this location."
         components = data['list'][0]['components']
         return components       
-    except requests.exceptions.RequestException as e:
-        return {"error":f"🚨 Network Error: {str(e)}"}
-    
+    except CircuitOpenError:
+        return {"error":"🚧 Air quality provider is unavailable. Please try again shortly."}
     except requests.exceptions.Timeout:
         return {"error":"⏳ Request timed out. Please try again."}
+    except requests.exceptions.RequestException as e:
+        return {"error":f"🚨 Network Error: {str(e)}"}
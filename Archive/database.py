@@ -0,0 +1,179 @@
+"""
+Shared database access for every page and script.
+
+The connection URL comes from configuration, first match wins:
+  1. the DATABASE_URL environment variable
+  2. [database] url = "..." in .streamlit/secrets.toml
+  3. DB_HOST / DB_PORT / DB_NAME / DB_USER / DB_PASS environment variables, or
+     host / port / name / user / password under [database] in secrets.toml
+
+There are no built-in credentials: with none of these set, get_engine() raises.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import sqlalchemy
+import streamlit as st
+from sqlalchemy import event
+
+# Pool sizing: a handful of reused connections shared by all sessions
+POOL_SIZE = 5
+MAX_OVERFLOW = 5
+POOL_TIMEOUT = 10          # seconds to wait for a free connection
+POOL_RECYCLE = 30 * 60     # reconnect before the server drops idle connections
+STATEMENT_TIMEOUT_MS = 15000
+CONNECT_TIMEOUT = 5
+
+
+class DatabaseConfigError(RuntimeError):
+    pass
+
+
+def _secret(key):
+    try:
+        return st.secrets["database"][key]
+    except Exception:
+        return None
+
+
+def database_url():
+    url = os.environ.get("DATABASE_URL") or _secret("url")
+    if url:
+        return url
+    settings = {
+        key: os.environ.get(env) or _secret(key)
+        for key, env in [("host", "DB_HOST"), ("port", "DB_PORT"), ("name", "DB_NAME"),
+                         ("user", "DB_USER"), ("password", "DB_PASS")]
+    }
+    missing = [key for key in ("host", "name", "user", "password") if not settings[key]]
+    if missing:
+        raise DatabaseConfigError(
+            "database connection is not configured: set DATABASE_URL or DB_HOST, DB_NAME, "
+            "DB_USER and DB_PASS (or [database] in .streamlit/secrets.toml); missing "
+            + ", ".join(missing)
+        )
+    return sqlalchemy.engine.URL.create(
+        "postgresql",
+        username=settings["user"],
+        password=settings["password"],
+        host=settings["host"],
+        port=int(settings["port"] or 5432),
+        database=settings["name"],
+    ).render_as_string(hide_password=False)
+
+
+class PoolMetrics:
+    """
+    Counters fed by pool events and by the connect()/begin() helpers
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.waits = 0
+
+    def record_wait(self, seconds):
+        with self.lock:
+            self.waits += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+    def attach(self, engine):
+        def count(name):
+            def listener(*args):
+                with self.lock:
+                    setattr(self, name, getattr(self, name) + 1)
+            return listener
+
+        event.listen(engine, "connect", count("connects"))
+        event.listen(engine, "checkout", count("checkouts"))
+        event.listen(engine, "checkin", count("checkins"))
+        event.listen(engine, "invalidate", count("invalidations"))
+
+
+def _create_engine(url):
+    connect_args = {}
+    if url.startswith("postgresql"):
+        connect_args = {
+            "connect_timeout": CONNECT_TIMEOUT,
+            "options": f"-c statement_timeout={STATEMENT_TIMEOUT_MS}",
+            "application_name": "lungs-of-tomorrow",
+        }
+    engine = sqlalchemy.create_engine(
+        url,
+        pool_size=POOL_SIZE,
+        max_overflow=MAX_OVERFLOW,
+        pool_timeout=POOL_TIMEOUT,
+        pool_recycle=POOL_RECYCLE,
+        pool_pre_ping=True,
+        connect_args=connect_args,
+    )
+    engine.metrics = PoolMetrics()
+    engine.metrics.attach(engine)
+    return engine
+
+
+@st.cache_resource
+def get_engine():
+    """
+    Process-wide pooled engine, created on first use
+    """
+    return _create_engine(database_url())
+
+
+def _record_wait(engine, seconds):
+    # engines not built by this module (e.g. in scripts) have no metrics
+    metrics = getattr(engine, "metrics", None)
+    if metrics is not None:
+        metrics.record_wait(seconds)
+
+
+@contextmanager
+def connect(engine=None):
+    """
+    engine.connect() that records how long the checkout waited for the pool
+    """
+    engine = engine or get_engine()
+    start = time.perf_counter()
+    with engine.connect() as connection:
+        _record_wait(engine, time.perf_counter() - start)
+        yield connection
+
+
+@contextmanager
+def begin(engine=None):
+    """
+    engine.begin() (one transaction) with the same wait accounting as connect()
+    """
+    engine = engine or get_engine()
+    start = time.perf_counter()
+    with engine.begin() as connection:
+        _record_wait(engine, time.perf_counter() - start)
+        yield connection
+
+
+def pool_stats(engine=None):
+    """
+    Snapshot of pool usage for dashboards and logs
+    """
+    engine = engine or get_engine()
+    pool, metrics = engine.pool, engine.metrics
+    with metrics.lock:
+        return {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "idle": pool.checkedin(),
+            "connects": metrics.connects,
+            "checkouts": metrics.checkouts,
+            "checkins": metrics.checkins,
+            "invalidations": metrics.invalidations,
+            "avg_wait_ms": 1000 * metrics.wait_total / metrics.waits if metrics.waits else 0.0,
+            "max_wait_ms": 1000 * metrics.wait_max,
+        }
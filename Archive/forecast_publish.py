@@ -0,0 +1,237 @@
+"""
+Incremental publishing of forecasts into a monthly-partitioned air_quality table
+(PostgreSQL only).
+
+Each refresh:
+  1. groups the new forecast by month and skips months whose content checksum
+     matches the last published one,
+  2. loads every changed month into a shadow table next to the live partition,
+  3. swaps all shadow tables in with DETACH/ATTACH in one transaction, so readers
+     see either the old or the new month and never a half-loaded table,
+  4. drops partitions that fell out of the retention window,
+  5. refreshes the per-date ranking view (forecast_ranking) in that same
+     transaction, so the ranking always matches the table.
+"""
+import datetime
+
+import pandas as pd
+import sqlalchemy
+
+from forecast_loader import COLUMNS, TABLE, copy_rows, ensure_date_index, ensure_updated_at, read_forecast_csv
+from forecast_ranking import drop_rankings, ensure_rankings, update_rankings
+
+METADATA_TABLE = "air_quality_partitions"
+DEFAULT_PARTITION = f"{TABLE}_default"
+
+# Months of history kept before the current month
+RETENTION_MONTHS = 3
+
+
+def month_start(date):
+    return datetime.date(date.year, date.month, 1)
+
+
+def next_month(month):
+    return datetime.date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f"{TABLE}_p{month:%Y%m}"
+
+
+def _relkind(connection, name):
+    return connection.execute(
+        sqlalchemy.text("SELECT relkind FROM pg_class WHERE relname = :name AND relkind IN ('r', 'p')"),
+        {"name": name},
+    ).scalar()
+
+
+def _retire_legacy_table(connection):
+    """
+    Move a plain (pre-partitioning) air_quality table and its indexes out of the way
+    """
+    connection.execute(sqlalchemy.text(f"ALTER TABLE {TABLE} RENAME TO {TABLE}_legacy"))
+    indexes = connection.execute(sqlalchemy.text(
+        "SELECT indexname FROM pg_indexes WHERE tablename = :table"
+    ), {"table": f"{TABLE}_legacy"}).scalars().all()
+    for index in indexes:
+        connection.execute(sqlalchemy.text(f"ALTER INDEX {index} RENAME TO {index}_legacy"))
+
+
+def ensure_partitioned_table(connection):
+    """
+    Partitioned parent (keyed like the bulk loader's unique index) with the
+    planner's date index, its default partition for out-of-range rows and the
+    per-month metadata table
+    """
+    connection.execute(sqlalchemy.text(f"""
+        CREATE TABLE IF NOT EXISTS {TABLE} (
+            state TEXT NOT NULL,
+            city TEXT NOT NULL,
+            date DATE NOT NULL,
+            aqi REAL,
+            updated_at TIMESTAMPTZ,
+            CONSTRAINT {TABLE}_state_city_date_key PRIMARY KEY (state, city, date)
+        ) PARTITION BY RANGE (date)
+    """))
+    ensure_updated_at(connection)
+    ensure_date_index(connection)
+    connection.execute(sqlalchemy.text(
+        f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT"
+    ))
+    connection.execute(sqlalchemy.text(f"""
+        CREATE TABLE IF NOT EXISTS {METADATA_TABLE} (
+            month DATE PRIMARY KEY,
+            checksum TEXT NOT NULL,
+            row_count INTEGER NOT NULL,
+            published_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+    """))
+
+
+def month_checksum(rows):
+    """
+    Order-independent content hash of one month of forecast rows
+    """
+    rows = rows[COLUMNS].sort_values(["state", "city", "date"]).reset_index(drop=True)
+    rows = rows.assign(date=rows["date"].astype(str), aqi=rows["aqi"].round(3))
+    return f"{int(pd.util.hash_pandas_object(rows, index=False).sum()) & (2 ** 64 - 1):016x}"
+
+
+def _published_checksums(connection):
+    if connection.execute(sqlalchemy.text("SELECT to_regclass(:name)"), {"name": METADATA_TABLE}).scalar() is None:
+        return {}
+    result = connection.execute(sqlalchemy.text(f"SELECT month, checksum FROM {METADATA_TABLE}"))
+    return dict(result.fetchall())
+
+
+def _build_shadow(connection, month, rows):
+    shadow = f"{partition_name(month)}_shadow"
+    connection.execute(sqlalchemy.text(f"DROP TABLE IF EXISTS {shadow}"))
+    # every row of a re-published month counts as updated
+    connection.execute(sqlalchemy.text(
+        f"CREATE TABLE {shadow} (state TEXT NOT NULL, city TEXT NOT NULL, date DATE NOT NULL, aqi REAL, "
+        f"updated_at TIMESTAMPTZ DEFAULT now())"
+    ))
+    copy_rows(connection, shadow, rows)
+    # matching indexes and a range check let ATTACH skip index builds and validation scans
+    connection.execute(sqlalchemy.text(f"ALTER TABLE {shadow} ADD PRIMARY KEY (state, city, date)"))
+    connection.execute(sqlalchemy.text(f"CREATE INDEX ON {shadow} (date, state, city)"))
+    connection.execute(sqlalchemy.text(
+        f"ALTER TABLE {shadow} ADD CONSTRAINT {shadow}_range "
+        f"CHECK (date >= DATE '{month}' AND date < DATE '{next_month(month)}')"
+    ))
+    return shadow
+
+
+def _swap_in(connection, month, shadow, checksum, row_count):
+    name = partition_name(month)
+    if _relkind(connection, name):
+        connection.execute(sqlalchemy.text(f"ALTER TABLE {TABLE} DETACH PARTITION {name}"))
+        connection.execute(sqlalchemy.text(f"DROP TABLE {name}"))
+    # rows that landed in the default partition for this month are superseded
+    connection.execute(sqlalchemy.text(
+        f"DELETE FROM {DEFAULT_PARTITION} WHERE date >= :lo AND date < :hi"
+    ), {"lo": month, "hi": next_month(month)})
+    connection.execute(sqlalchemy.text(f"ALTER TABLE {shadow} RENAME TO {name}"))
+    connection.execute(sqlalchemy.text(
+        f"ALTER TABLE {TABLE} ATTACH PARTITION {name} FOR VALUES FROM ('{month}') TO ('{next_month(month)}')"
+    ))
+    connection.execute(sqlalchemy.text(f"ALTER TABLE {name} DROP CONSTRAINT {shadow}_range"))
+    connection.execute(sqlalchemy.text(f"""
+        INSERT INTO {METADATA_TABLE} (month, checksum, row_count, published_at)
+        VALUES (:month, :checksum, :row_count, now())
+        ON CONFLICT (month) DO UPDATE SET checksum = EXCLUDED.checksum,
+            row_count = EXCLUDED.row_count, published_at = EXCLUDED.published_at
+    """), {"month": month, "checksum": checksum, "row_count": row_count})
+
+
+def retention_cutoff(retention_months=RETENTION_MONTHS, today=None):
+    """
+    First month still kept: the current month minus `retention_months`
+    """
+    cutoff = month_start(today or datetime.date.today())
+    for _ in range(retention_months):
+        cutoff = month_start(cutoff - datetime.timedelta(days=1))
+    return cutoff
+
+
+def retire_partitions(connection, retention_months=RETENTION_MONTHS, today=None):
+    """
+    Drop monthly partitions that ended before the retention window
+    """
+    cutoff = retention_cutoff(retention_months, today)
+    retired = []
+    for month in connection.execute(sqlalchemy.text(
+        f"SELECT month FROM {METADATA_TABLE} WHERE month < :cutoff ORDER BY month"
+    ), {"cutoff": cutoff}).scalars().all():
+        name = partition_name(month)
+        if _relkind(connection, name):
+            connection.execute(sqlalchemy.text(f"ALTER TABLE {TABLE} DETACH PARTITION {name}"))
+            connection.execute(sqlalchemy.text(f"DROP TABLE {name}"))
+        connection.execute(sqlalchemy.text(f"DELETE FROM {METADATA_TABLE} WHERE month = :month"), {"month": month})
+        retired.append(month)
+    connection.execute(sqlalchemy.text(f"DELETE FROM {DEFAULT_PARTITION} WHERE date < :cutoff"), {"cutoff": cutoff})
+    return retired
+
+
+def publish_forecast(engine, df, retention_months=RETENTION_MONTHS):
+    """
+    Publish a forecast DataFrame (state, city, date, aqi) month by month.
+    Months whose content is unchanged are skipped. Returns a dict with the
+    published, unchanged and retired months.
+    """
+    df = df[COLUMNS].drop_duplicates(subset=["state", "city", "date"], keep="last")
+    with engine.connect() as connection:
+        legacy = _relkind(connection, TABLE) == "r"
+        published = _published_checksums(connection)
+        if legacy:
+            # rows of the plain table fill months the new forecast does not cover
+            old = pd.read_sql(sqlalchemy.text(f"SELECT {', '.join(COLUMNS)} FROM {TABLE}"), connection)
+            old["date"] = pd.to_datetime(old["date"]).dt.date
+            covered = set(df["date"].map(month_start))
+            df = pd.concat([old[~old["date"].map(month_start).isin(covered)], df], ignore_index=True)
+
+    cutoff = retention_cutoff(retention_months)
+    changed, unchanged = [], []
+    for month, rows in df.groupby(df["date"].map(month_start)):
+        if month < cutoff:
+            continue
+        checksum = month_checksum(rows)
+        if published.get(month) == checksum:
+            unchanged.append(month)
+        else:
+            changed.append((month, rows, checksum))
+
+    # shadow tables are invisible to readers, so load them outside the swap
+    shadows = []
+    with engine.begin() as connection:
+        for month, rows, checksum in changed:
+            shadows.append((month, _build_shadow(connection, month, rows), checksum, len(rows)))
+
+    # one transaction: readers see the previous table until every month is swapped in
+    with engine.begin() as connection:
+        if legacy:
+            # the ranking view depends on the plain table; rebuild it on the new one
+            drop_rankings(connection)
+            _retire_legacy_table(connection)
+        ensure_partitioned_table(connection)
+        for month, shadow, checksum, row_count in shadows:
+            _swap_in(connection, month, shadow, checksum, row_count)
+        retired = retire_partitions(connection, retention_months)
+        if legacy:
+            connection.execute(sqlalchemy.text(f"DROP TABLE {TABLE}_legacy"))
+        if shadows or retired:
+            update_rankings(connection)
+        else:
+            ensure_rankings(connection)
+
+    return {
+        "published": [month for month, *_ in shadows],
+        "unchanged": unchanged,
+        "retired": retired,
+    }
+
+
+def publish_forecast_csv(engine, csv_file, retention_months=RETENTION_MONTHS):
+    return publish_forecast(engine, read_forecast_csv(csv_file), retention_months)
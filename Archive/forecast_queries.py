@@ -0,0 +1,29 @@
+import pandas as pd
+import sqlalchemy
+from sqlalchemy import bindparam
+
+from database import connect
+from forecast_ranking import RANK_VIEW
+
+# Columns of the ranking the route planner shows, in display order
+RANKED_COLUMNS = ["National Rank", "State Rank", "State", "City", "AQI", "Category", "Risk Score"]
+
+
+def load_ranked_forecast(engine, date, states, cities, limit=None):
+    """
+    Selected cities for one date, best air first, read from the precomputed ranking
+    """
+    if not states or not cities:
+        return pd.DataFrame(columns=RANKED_COLUMNS)
+    query = sqlalchemy.text(
+        f"""
+        SELECT national_rank, state_rank, state, city, aqi, category, risk_score FROM {RANK_VIEW}
+        WHERE date = :date AND state IN :states AND city IN :cities
+        ORDER BY national_rank, state, city
+        LIMIT :limit
+        """
+    ).bindparams(bindparam("states", expanding=True), bindparam("cities", expanding=True))
+    params = {"date": date, "states": list(states), "cities": list(cities), "limit": limit}
+    with connect(engine) as connection:
+        result = connection.execute(query, params)
+        return pd.DataFrame(result.fetchall(), columns=RANKED_COLUMNS)
@@ -0,0 +1,96 @@
+"""
+Per-date city ranking of the forecast, kept as a PostgreSQL materialized view
+(air_quality_rank) and refreshed whenever air_quality is reloaded.
+"""
+import sqlalchemy
+
+from accessory_functions import AQI_BREAKPOINTS, AQI_CATEGORIES, RISK_SCORES, classify_aqi
+from forecast_loader import TABLE
+
+RANK_VIEW = "air_quality_rank"
+RANK_COLUMNS = ["national_rank", "state_rank", "state", "city", "aqi", "category", "risk_score"]
+
+
+def _band_case(values):
+    # CASE expression over the shared AQI breakpoint table
+    whens = " ".join(
+        f"WHEN aqi <= {upper} THEN {value}" for upper, value in zip(AQI_BREAKPOINTS, values[:-1])
+    )
+    return f"CASE {whens} ELSE {values[-1]} END"
+
+
+def _view_exists(connection):
+    return connection.execute(
+        sqlalchemy.text("SELECT 1 FROM pg_matviews WHERE matviewname = :name"), {"name": RANK_VIEW}
+    ).scalar() is not None
+
+
+def ensure_rankings(connection):
+    """
+    Create the ranking view and its indexes if missing; True when it was created
+    """
+    if _view_exists(connection):
+        return False
+    categories = [f"'{category}'" for category in AQI_CATEGORIES]
+    connection.execute(sqlalchemy.text(f"""
+        CREATE MATERIALIZED VIEW {RANK_VIEW} AS
+        SELECT
+            date, state, city, aqi,
+            RANK() OVER (PARTITION BY date ORDER BY aqi) AS national_rank,
+            RANK() OVER (PARTITION BY date, state ORDER BY aqi) AS state_rank,
+            {_band_case(categories)} AS category,
+            {_band_case([str(score) for score in RISK_SCORES])} AS risk_score
+        FROM {TABLE}
+        WHERE aqi IS NOT NULL
+    """))
+    # the unique index also allows REFRESH ... CONCURRENTLY
+    connection.execute(sqlalchemy.text(
+        f"CREATE UNIQUE INDEX {RANK_VIEW}_key ON {RANK_VIEW} (date, state, city)"
+    ))
+    connection.execute(sqlalchemy.text(
+        f"CREATE INDEX {RANK_VIEW}_national ON {RANK_VIEW} (date, national_rank)"
+    ))
+    connection.execute(sqlalchemy.text(
+        f"CREATE INDEX {RANK_VIEW}_state ON {RANK_VIEW} (date, state, state_rank)"
+    ))
+    return True
+
+
+def drop_rankings(connection):
+    connection.execute(sqlalchemy.text(f"DROP MATERIALIZED VIEW IF EXISTS {RANK_VIEW}"))
+
+
+def update_rankings(connection):
+    """
+    Create or rebuild the ranking inside the caller's transaction; readers
+    keep the old ranking until it commits
+    """
+    if not ensure_rankings(connection):
+        connection.execute(sqlalchemy.text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {RANK_VIEW}"))
+
+
+def refresh_rankings(engine):
+    """
+    Rebuild the ranking after air_quality changed. No-op on non-PostgreSQL
+    databases.
+    """
+    if engine.dialect.name != "postgresql":
+        return
+    with engine.begin() as connection:
+        update_rankings(connection)
+
+
+def rank_frame(df):
+    """
+    The view's ranking computed in pandas for one date of forecast rows
+    (state, city, aqi), for when the database is not reachable
+    """
+    df = df.dropna(subset=["aqi"])
+    classes = classify_aqi(df["aqi"])
+    ranked = df.assign(
+        national_rank=df["aqi"].rank(method="min").astype(int),
+        state_rank=df.groupby("state")["aqi"].rank(method="min").astype(int),
+        category=classes["category"],
+        risk_score=classes["risk_score"],
+    )
+    return ranked.sort_values(["national_rank", "state", "city"])[RANK_COLUMNS]
@@ -0,0 +1,273 @@
+"""
+Local Parquet snapshot of the air_quality forecast table.
+
+Layout: one file per forecast date under SNAPSHOT_DIR/date=YYYY-MM-DD/, plus a
+watermark file. Files are memory-mapped when read, so every Streamlit process
+on the host shares the same page cache instead of holding its own copy, and
+filters on date/state/city are pushed down to the Parquet reader.
+
+Sync is incremental from the watermark:
+  * dates with rows updated since the last sync (updated_at, set by the loader
+    and by forecast_publish) are re-read,
+  * months re-published by forecast_publish since the last sync are re-read,
+    so rows it dropped disappear too,
+  * dates the database no longer has (retention) are removed.
+With AQI_OFFLINE=1 the snapshot is read as-is and the database is never touched.
+
+Every process on the host shares the directory, so a sync holds an exclusive
+lock on it and reads hold a shared one: only one sync runs at a time and no
+read sees a date directory removed halfway through.
+
+    python forecast_snapshot.py --database-url postgresql://... [--full]
+"""
+import argparse
+import datetime
+import fcntl
+import json
+import os
+import shutil
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import sqlalchemy
+from pyarrow import fs
+
+from forecast_loader import COLUMNS, TABLE
+from forecast_publish import METADATA_TABLE, month_start, next_month
+from forecast_queries import RANKED_COLUMNS
+from forecast_ranking import RANK_COLUMNS, rank_frame
+
+SNAPSHOT_DIR = os.environ.get(
+    "AQI_SNAPSHOT_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "forecast_snapshot")
+)
+WATERMARK_FILE = "_watermark.json"
+# the underscore keeps both files out of dataset discovery
+LOCK_FILE = "_sync.lock"
+OFFLINE = os.environ.get("AQI_OFFLINE") == "1"
+
+SCHEMA = pa.schema([
+    ("state", pa.string()),
+    ("city", pa.string()),
+    ("aqi", pa.float32()),
+])
+PARTITIONING = ds.partitioning(pa.schema([("date", pa.date32())]), flavor="hive")
+
+
+@contextmanager
+def snapshot_lock(directory=SNAPSHOT_DIR, exclusive=False, blocking=True):
+    """
+    Advisory lock on the snapshot directory, shared by every process on the host.
+    Yields False, without waiting, when `blocking` is off and the lock is taken.
+    """
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, LOCK_FILE), "a") as f:
+        try:
+            fcntl.flock(f, (fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH) | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _date_dir(directory, date):
+    return os.path.join(directory, f"date={date:%Y-%m-%d}")
+
+
+def _local_dates(directory):
+    if not os.path.isdir(directory):
+        return []
+    return sorted(
+        datetime.date.fromisoformat(name[len("date="):])
+        for name in os.listdir(directory) if name.startswith("date=")
+    )
+
+
+def read_watermark(directory=SNAPSHOT_DIR):
+    path = os.path.join(directory, WATERMARK_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        watermark = json.load(f)
+    if watermark.get("updated_at") is None:
+        # written before updated_at existed, or over rows that all lack it
+        return None
+    return {
+        "updated_at": datetime.datetime.fromisoformat(watermark["updated_at"]),
+        "published_at": watermark["published_at"] and datetime.datetime.fromisoformat(watermark["published_at"]),
+        "synced_at": watermark["synced_at"],
+    }
+
+
+def _write_watermark(directory, updated_at, published_at):
+    path = os.path.join(directory, WATERMARK_FILE)
+    with open(path + ".tmp", "w") as f:
+        json.dump({
+            "updated_at": updated_at and updated_at.isoformat(),
+            "published_at": published_at and published_at.isoformat(),
+            "synced_at": time.time(),
+        }, f)
+    os.replace(path + ".tmp", path)
+
+
+def _as_date(value):
+    # SQLite returns dates and timestamps as strings
+    return None if value is None else pd.Timestamp(value).date()
+
+
+def _as_datetime(value):
+    return None if value is None else pd.Timestamp(value).to_pydatetime()
+
+
+def _write_date(directory, date, rows):
+    # write next to the target and rename, so readers never see a partial file
+    target = _date_dir(directory, date)
+    os.makedirs(target, exist_ok=True)
+    table = pa.Table.from_pandas(rows[["state", "city", "aqi"]], schema=SCHEMA, preserve_index=False)
+    # the dot prefix keeps the temporary file out of dataset discovery
+    temporary = os.path.join(target, ".part-0.parquet.tmp")
+    pq.write_table(table, temporary)
+    os.replace(temporary, os.path.join(target, "part-0.parquet"))
+
+
+def _remove_date(directory, date):
+    shutil.rmtree(_date_dir(directory, date), ignore_errors=True)
+
+
+def _changed_months(connection, published_at):
+    # only the partitioned table (forecast_publish) records when a month changed
+    if connection.execute(sqlalchemy.text("SELECT to_regclass(:name)"), {"name": METADATA_TABLE}).scalar() is None:
+        return [], None
+    rows = connection.execute(sqlalchemy.text(
+        f"SELECT month, published_at FROM {METADATA_TABLE}"
+    )).fetchall()
+    latest = max((row.published_at for row in rows), default=None)
+    changed = [row.month for row in rows if published_at is None or row.published_at > published_at]
+    return changed, latest
+
+
+def sync_snapshot(engine, directory=SNAPSHOT_DIR, full=False, wait=True):
+    """
+    Bring the snapshot up to date with air_quality.
+    Returns a dict with the dates written and removed, or None when `wait` is
+    off and another process is already syncing.
+    """
+    with snapshot_lock(directory, exclusive=True, blocking=wait) as locked:
+        if not locked:
+            return None
+        return _sync(engine, directory, full)
+
+
+def _sync(engine, directory, full):
+    watermark = None if full else read_watermark(directory)
+    with engine.connect() as connection:
+        if engine.dialect.name == "postgresql":
+            months, latest = _changed_months(connection, watermark and watermark["published_at"])
+        else:
+            months, latest = [], None
+        # a table the loader has not migrated yet can only be re-read in full
+        if "updated_at" not in {column["name"] for column in sqlalchemy.inspect(connection).get_columns(TABLE)}:
+            watermark = None
+            min_date, updated_at = connection.execute(sqlalchemy.text(f"SELECT MIN(date), NULL FROM {TABLE}")).one()
+        else:
+            min_date, updated_at = connection.execute(
+                sqlalchemy.text(f"SELECT MIN(date), MAX(updated_at) FROM {TABLE}")
+            ).one()
+
+        conditions, params = [], {}
+        if watermark is None:
+            conditions.append("true")
+        else:
+            conditions.append(f"date IN (SELECT date FROM {TABLE} WHERE updated_at > :since)")
+            params["since"] = watermark["updated_at"]
+            for i, month in enumerate(months):
+                conditions.append(f"(date >= :lo{i} AND date < :hi{i})")
+                params[f"lo{i}"], params[f"hi{i}"] = month, next_month(month)
+        df = pd.read_sql(
+            sqlalchemy.text(f"SELECT {', '.join(COLUMNS)} FROM {TABLE} WHERE {' OR '.join(conditions)}"),
+            connection, params=params,
+        )
+
+    df["date"] = pd.to_datetime(df["date"]).dt.date
+    os.makedirs(directory, exist_ok=True)
+    written = []
+    for date, rows in df.groupby("date"):
+        _write_date(directory, date, rows)
+        written.append(date)
+
+    # dates that are gone upstream: outside the table's range, or missing from a re-read month
+    min_date = _as_date(min_date)
+    refetched = set(written)
+    removed = []
+    for date in _local_dates(directory):
+        reread = watermark is None or month_start(date) in months
+        if min_date is None or date < min_date or (reread and date not in refetched):
+            _remove_date(directory, date)
+            removed.append(date)
+
+    if min_date is not None:
+        _write_watermark(directory, _as_datetime(updated_at), latest)
+    return {"written": written, "removed": removed}
+
+
+def has_snapshot(directory=SNAPSHOT_DIR):
+    return bool(_local_dates(directory))
+
+
+def snapshot_dataset(directory=SNAPSHOT_DIR):
+    """
+    Memory-mapped dataset over the snapshot, partitioned by date
+    """
+    return ds.dataset(
+        directory,
+        format="parquet",
+        partitioning=PARTITIONING,
+        filesystem=fs.LocalFileSystem(use_mmap=True),
+    )
+
+
+def _scan(date, states=None, cities=None, columns=None, directory=SNAPSHOT_DIR):
+    condition = ds.field("date") == pa.scalar(date, pa.date32())
+    if states is not None:
+        condition &= ds.field("state").isin(list(states))
+    if cities is not None:
+        condition &= ds.field("city").isin(list(cities))
+    with snapshot_lock(directory):
+        return snapshot_dataset(directory).to_table(columns=columns, filter=condition)
+
+
+def load_ranked_snapshot(date, states, cities, directory=SNAPSHOT_DIR):
+    """
+    load_ranked_forecast() from the snapshot: ranks are computed over every
+    city of the date, then limited to the selection
+    """
+    if not states or not cities or not has_snapshot(directory):
+        return pd.DataFrame(columns=RANKED_COLUMNS)
+    ranked = rank_frame(_scan(date, columns=["state", "city", "aqi"], directory=directory).to_pandas())
+    ranked = ranked[ranked["state"].isin(states) & ranked["city"].isin(cities)]
+    return ranked.rename(columns=dict(zip(RANK_COLUMNS, RANKED_COLUMNS))).reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync the local Parquet snapshot of air_quality")
+    parser.add_argument("--database-url", required=True)
+    parser.add_argument("--directory", default=SNAPSHOT_DIR)
+    parser.add_argument("--full", action="store_true", help="ignore the watermark and re-read everything")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    stats = sync_snapshot(sqlalchemy.create_engine(args.database_url), args.directory, args.full)
+    print(
+        f"{len(stats['written'])} dates written, {len(stats['removed'])} removed "
+        f"in {time.perf_counter() - start:.2f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
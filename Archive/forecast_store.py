@@ -0,0 +1,164 @@
+"""
+Compact in-memory forecast store for the route planner.
+
+Rows are sorted by day, then state and city, and kept as parallel numpy arrays:
+  state / city : int16 codes into the categorical `states` / `cities` labels
+  day          : int32 days since 1970-01-01
+  aqi          : float32
+An offsets array maps each day to its row slice, so selecting a date is O(1).
+
+    python forecast_store.py        # memory use against the plain DataFrame
+"""
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from forecast_snapshot import SNAPSHOT_DIR, has_snapshot, snapshot_dataset, snapshot_lock
+
+EPOCH = datetime.date(1970, 1, 1)
+
+
+def day_number(date):
+    return (date - EPOCH).days
+
+
+class ForecastStore:
+    def __init__(self, states, cities, state_codes, city_codes, days, aqi):
+        self.states = states
+        self.cities = cities
+        self.state_codes = state_codes
+        self.city_codes = city_codes
+        self.days = days
+        self.aqi = aqi
+        self.first_day = int(days[0]) if len(days) else 0
+        last_day = int(days[-1]) if len(days) else -1
+        # offsets[i]:offsets[i + 1] are the rows of day first_day + i
+        self.offsets = np.searchsorted(days, np.arange(self.first_day, last_day + 2, dtype=np.int32))
+
+    @classmethod
+    def from_frame(cls, df):
+        """
+        Build from a frame with state, city, date and aqi columns
+        """
+        df = df.dropna(subset=["state", "city", "date"])
+        state = pd.Categorical(df["state"])
+        city = pd.Categorical(df["city"])
+        days = (pd.to_datetime(df["date"]).to_numpy().astype("datetime64[D]").astype(np.int64)).astype(np.int32)
+        state_codes = state.codes.astype(np.int16)
+        city_codes = city.codes.astype(np.int16)
+        order = np.lexsort((city_codes, state_codes, days))
+        return cls(
+            state.categories, city.categories,
+            state_codes[order], city_codes[order], days[order],
+            df["aqi"].to_numpy(dtype=np.float32)[order],
+        )
+
+    @classmethod
+    def from_snapshot(cls, directory=SNAPSHOT_DIR):
+        if not has_snapshot(directory):
+            return cls.from_frame(pd.DataFrame(columns=["state", "city", "date", "aqi"]))
+        with snapshot_lock(directory):
+            table = snapshot_dataset(directory).to_table(columns=["state", "city", "date", "aqi"])
+        return cls.from_frame(table.to_pandas())
+
+    def __len__(self):
+        return len(self.days)
+
+    def day_slice(self, date):
+        i = day_number(date) - self.first_day
+        if i < 0 or i >= len(self.offsets) - 1:
+            return slice(0, 0)
+        return slice(self.offsets[i], self.offsets[i + 1])
+
+    def dates(self):
+        counts = np.diff(self.offsets)
+        return [EPOCH + datetime.timedelta(days=int(self.first_day + i)) for i in np.flatnonzero(counts)]
+
+    def _codes(self, labels, values):
+        return labels.get_indexer(list(values))
+
+    def states_on(self, date):
+        codes = np.unique(self.state_codes[self.day_slice(date)])
+        return list(self.states[codes])
+
+    def cities_on(self, date, states):
+        rows = self.day_slice(date)
+        mask = np.isin(self.state_codes[rows], self._codes(self.states, states))
+        return list(self.cities[np.unique(self.city_codes[rows][mask])])
+
+    def select(self, date, states=None, cities=None):
+        """
+        One day's rows as a DataFrame with State, City, Date and AQI
+        """
+        rows = self.day_slice(date)
+        mask = np.ones(rows.stop - rows.start, dtype=bool)
+        if states is not None:
+            mask &= np.isin(self.state_codes[rows], self._codes(self.states, states))
+        if cities is not None:
+            mask &= np.isin(self.city_codes[rows], self._codes(self.cities, cities))
+        return pd.DataFrame({
+            "State": self.states[self.state_codes[rows][mask]],
+            "City": self.cities[self.city_codes[rows][mask]],
+            "Date": date,
+            "AQI": self.aqi[rows][mask],
+        })
+
+    def aqi_matrix(self, dates, pairs):
+        """
+        (len(pairs), len(dates)) float32 AQI for (state, city) pairs, NaN where missing
+        """
+        state_codes = self._codes(self.states, [state for state, _ in pairs])
+        city_codes = self._codes(self.cities, [city for _, city in pairs])
+        wanted = state_codes.astype(np.int64) * len(self.cities) + city_codes
+        known = (state_codes >= 0) & (city_codes >= 0)
+        matrix = np.full((len(pairs), len(dates)), np.nan, dtype=np.float32)
+        for column, date in enumerate(dates):
+            rows = self.day_slice(date)
+            # rows of a day are sorted by state then city, so their keys are sorted too
+            keys = self.state_codes[rows].astype(np.int64) * len(self.cities) + self.city_codes[rows]
+            if len(keys) == 0:
+                continue
+            position = np.minimum(np.searchsorted(keys, wanted), len(keys) - 1)
+            found = known & (keys[position] == wanted)
+            matrix[found, column] = self.aqi[rows][position[found]]
+        return matrix
+
+    @property
+    def nbytes(self):
+        arrays = [self.state_codes, self.city_codes, self.days, self.aqi, self.offsets]
+        labels = self.states.memory_usage(deep=True) + self.cities.memory_usage(deep=True)
+        return sum(array.nbytes for array in arrays) + labels
+
+
+def memory_report(store, df):
+    """
+    Bytes used by the store against an equivalent DataFrame (deep, incl. strings)
+    """
+    frame_bytes = int(df.memory_usage(deep=True, index=True).sum())
+    return {
+        "rows": len(store),
+        "dataframe_bytes": frame_bytes,
+        "store_bytes": int(store.nbytes),
+        "ratio": frame_bytes / store.nbytes if store.nbytes else 0.0,
+    }
+
+
+def main():
+    store = ForecastStore.from_snapshot()
+    # what load_data() used to hold: object strings and python dates on every row
+    df = pd.DataFrame({
+        "State": store.states[store.state_codes].astype(object),
+        "City": store.cities[store.city_codes].astype(object),
+        "Date": (store.days.astype("datetime64[D]")).astype(object),
+        "AQI": store.aqi.astype(float),
+    })
+    report = memory_report(store, df)
+    print(
+        f"{report['rows']} rows: DataFrame {report['dataframe_bytes'] / 1e6:.2f} MB, "
+        f"store {report['store_bytes'] / 1e6:.2f} MB ({report['ratio']:.1f}x smaller)"
+    )
+
+
+if __name__ == "__main__":
+    main()
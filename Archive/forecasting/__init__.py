@@ -0,0 +1,7 @@
+"""
+Per-city AQI forecasting pipeline behind malaysia_predicted_aqi.csv.
+
+    python -m forecasting --data-dir data --model ets --workers 8
+"""
+from forecasting.models import MODELS, get_model
+from forecasting.pipeline import discover_cities, run_forecast, run_pipeline
@@ -0,0 +1,45 @@
+import argparse
+import os
+
+from forecasting.manifest import CACHE_DIR, CHANGES_FILE, run_incremental
+from forecasting.models import MODELS
+from forecasting.pipeline import DATA_DIR, DEFAULT_MODEL, HORIZON, OUTPUT_FILE, run_pipeline
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Forecast AQI for every city CSV under the data directory")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--output", default=OUTPUT_FILE)
+    parser.add_argument("--model", choices=list(MODELS), default=DEFAULT_MODEL)
+    parser.add_argument("--horizon", type=int, default=HORIZON, help="days to forecast")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="processes; 1 runs in-process")
+    parser.add_argument("--no-history", action="store_true", help="write forecast days only")
+    parser.add_argument("--history-dir", help="read the Parquet history dataset (forecasting/history.py) instead of CSVs")
+    parser.add_argument("--incremental", action="store_true",
+                        help="refit only cities whose CSV or settings changed (see forecasting/manifest.py)")
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--changes", default=CHANGES_FILE, help="changed rows, with --incremental")
+    args = parser.parse_args()
+    if args.incremental and args.history_dir:
+        # the manifest tracks the hash of each city CSV, which the history dataset has no equivalent of
+        parser.error("--history-dir cannot be combined with --incremental")
+
+    if args.incremental:
+        changes, timings, refitted = run_incremental(
+            args.data_dir, args.output, args.changes, args.model, args.horizon, args.workers,
+            not args.no_history, args.cache_dir,
+        )
+        print(f"{len(refitted)} cities refitted, {len(changes)} changed rows -> {args.changes}")
+    else:
+        df, timings = run_pipeline(
+            args.data_dir, args.output, args.model, args.horizon, args.workers, not args.no_history,
+            args.history_dir,
+        )
+        cities = len(df[["state", "city"]].drop_duplicates())
+        print(f"{cities} cities, {len(df)} rows -> {args.output}")
+    for stage, seconds in timings.items():
+        print(f"  {stage:<9} {seconds:8.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+Historical AQI archive: streams every data/<state>/<city>-air-quality.csv into
+one Parquet dataset partitioned by state and year (history/state=.../year=...).
+
+Files are read in chunks and each chunk is normalised, validated and
+deduplicated on its own, so peak memory depends on the chunk size and not on
+how many cities or years of history there are. Each city's rows are written
+sorted by date as their own row groups, so the min/max statistics let queries
+skip every other city and date range.
+
+    python -m forecasting.history --data-dir data --out history
+
+Queries read only the matching partitions, row groups and columns:
+
+    city_history("Johor", "Kluang", start, end)
+    month_history(2024, 6, columns=["state", "city", "date", "aqi"])
+"""
+import argparse
+import datetime
+import os
+import resource
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from forecasting.pipeline import DATA_DIR, discover_cities
+
+HISTORY_DIR = "history"
+CHUNK_ROWS = 50_000
+POLLUTANTS = ["pm25", "pm10", "o3", "no2", "so2", "co"]
+SCHEMA = pa.schema(
+    [("city", pa.string()), ("date", pa.date32()), ("aqi", pa.float32())]
+    + [(name, pa.float32()) for name in POLLUTANTS]
+)
+PARTITIONING = ds.partitioning(pa.schema([("state", pa.string()), ("year", pa.int32())]), flavor="hive")
+
+
+def normalise_chunk(chunk, path):
+    """
+    One CSV chunk in the archive schema: typed, with rows lacking a date or
+    AQI dropped. Raises ValueError if the file lacks the required columns.
+    """
+    chunk.columns = chunk.columns.str.strip().str.lower()
+    missing = {"date", "aqi"} - set(chunk.columns)
+    if missing:
+        raise ValueError(f"{path}: missing column(s) {', '.join(sorted(missing))}")
+    df = pd.DataFrame({
+        "date": pd.to_datetime(chunk["date"].str.strip(), errors="coerce"),
+        "aqi": pd.to_numeric(chunk["aqi"], errors="coerce"),
+    })
+    for name in POLLUTANTS:
+        df[name] = pd.to_numeric(chunk[name], errors="coerce") if name in chunk else np.nan
+    return df.dropna(subset=["date", "aqi"])
+
+
+def iter_city_chunks(path, chunk_rows=CHUNK_ROWS):
+    """
+    (rows read, normalised rows) per chunk of one city CSV
+    """
+    # everything as text first so one malformed value cannot fail the chunk
+    for chunk in pd.read_csv(path, chunksize=chunk_rows, dtype=str, skipinitialspace=True):
+        yield len(chunk), normalise_chunk(chunk, path)
+
+
+class StateWriter:
+    """
+    Open Parquet writers for one state, one file per year. Cities of a state are
+    ingested one after another, so at most one state's files are open at a time.
+    """
+    def __init__(self, out_dir, state):
+        self.out_dir = out_dir
+        self.state = state
+        self.writers = {}
+
+    def write(self, year, table):
+        writer = self.writers.get(year)
+        if writer is None:
+            directory = os.path.join(self.out_dir, f"state={self.state}", f"year={year}")
+            os.makedirs(directory, exist_ok=True)
+            writer = pq.ParquetWriter(os.path.join(directory, "part-0.parquet"), SCHEMA)
+            self.writers[year] = writer
+        writer.write_table(table)
+
+    def close(self):
+        for writer in self.writers.values():
+            writer.close()
+        self.writers = {}
+
+
+def ingest_history(data_dir=DATA_DIR, out_dir=HISTORY_DIR, chunk_rows=CHUNK_ROWS):
+    """
+    Rebuild the history dataset from the CSV archive. The new dataset is written
+    beside the old one and swapped in at the end. Returns ingestion counters.
+    """
+    stats = {"cities": 0, "rows_read": 0, "rows_written": 0, "invalid": 0, "duplicates": 0}
+    building = out_dir.rstrip("/") + ".building"
+    shutil.rmtree(building, ignore_errors=True)
+
+    writer = None
+    for state, city, path in discover_cities(data_dir):
+        if writer is None or writer.state != state:
+            if writer is not None:
+                writer.close()
+            writer = StateWriter(building, state)
+        stats["cities"] += 1
+        # first row wins for a date repeated anywhere in the city's file, as in
+        # pipeline.read_history; later chunks cannot overrule rows already written
+        seen = set()
+        for rows_read, df in iter_city_chunks(path, chunk_rows):
+            stats["rows_read"] += rows_read
+            stats["invalid"] += rows_read - len(df)
+            days = pd.Series(df["date"].to_numpy().astype("datetime64[D]").astype(np.int64))
+            fresh = (~days.isin(seen) & ~days.duplicated()).to_numpy()
+            seen.update(days[fresh].tolist())
+            stats["duplicates"] += int((~fresh).sum())
+            df = df[fresh].sort_values("date")
+            stats["rows_written"] += len(df)
+            for year, rows in df.groupby(df["date"].dt.year):
+                table = pa.Table.from_pandas(
+                    rows.assign(city=city, date=rows["date"].dt.date)[SCHEMA.names],
+                    schema=SCHEMA, preserve_index=False,
+                )
+                writer.write(int(year), table)
+    if writer is not None:
+        writer.close()
+
+    if os.path.exists(out_dir):
+        shutil.rmtree(out_dir)
+    if os.path.exists(building):
+        os.rename(building, out_dir)
+    return stats
+
+
+def history_dataset(directory=HISTORY_DIR):
+    return ds.dataset(directory, format="parquet", partitioning=PARTITIONING)
+
+
+def query_history(state=None, city=None, start=None, end=None, columns=None, directory=HISTORY_DIR):
+    """
+    History rows matching every given filter, as a DataFrame. state and the
+    years of start/end prune partitions; city and the dates prune row groups.
+    `columns` may include the partition columns state and year.
+    """
+    condition = None
+
+    def add(expression):
+        nonlocal condition
+        condition = expression if condition is None else condition & expression
+
+    if state is not None:
+        add(ds.field("state") == state)
+    if city is not None:
+        add(ds.field("city") == city)
+    if start is not None:
+        add(ds.field("year") >= start.year)
+        add(ds.field("date") >= pa.scalar(start, pa.date32()))
+    if end is not None:
+        add(ds.field("year") <= end.year)
+        add(ds.field("date") <= pa.scalar(end, pa.date32()))
+    table = history_dataset(directory).to_table(columns=columns, filter=condition)
+    return table.to_pandas()
+
+
+def city_history(state, city, start=None, end=None, columns=("date", "aqi"), directory=HISTORY_DIR):
+    """
+    One city's rows between start and end (inclusive), oldest first
+    """
+    df = query_history(state, city, start, end, list(columns), directory)
+    return df.sort_values("date").reset_index(drop=True) if "date" in df else df
+
+
+def month_history(year, month, columns=("state", "city", "date", "aqi"), directory=HISTORY_DIR):
+    """
+    Every city's rows for one calendar month
+    """
+    first = datetime.date(year, month, 1)
+    last = datetime.date(year + month // 12, month % 12 + 1, 1) - datetime.timedelta(days=1)
+    return query_history(start=first, end=last, columns=list(columns), directory=directory)
+
+
+def history_cities(directory=HISTORY_DIR):
+    """
+    (state, city) pairs in the dataset; reads only the state and city columns
+    """
+    table = history_dataset(directory).to_table(columns=["state", "city"])
+    pairs = table.group_by(["state", "city"]).aggregate([])
+    return sorted(zip(pairs.column("state").to_pylist(), pairs.column("city").to_pylist()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream the per-city CSV archive into the Parquet history dataset")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--out", default=HISTORY_DIR)
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    stats = ingest_history(args.data_dir, args.out, args.chunk_rows)
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(
+        f"{stats['cities']} cities, {stats['rows_written']} rows written "
+        f"({stats['duplicates']} duplicate dates, {stats['invalid']} invalid rows dropped) "
+        f"in {time.perf_counter() - start:.2f}s, peak RSS {peak_mb:.0f} MB"
+    )
+
+
+if __name__ == "__main__":
+    main()
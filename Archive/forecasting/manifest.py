@@ -0,0 +1,137 @@
+"""
+Incremental re-forecasting. A manifest records, per city, the content hash of
+its input CSV and the model settings it was fitted with; each city's forecast
+is cached next to it. A run refits only the cities whose entry no longer
+matches and reports just the rows that changed, ready for forecast_loader's
+upsert.
+"""
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from forecasting.pipeline import (
+    DATA_DIR, DEFAULT_MODEL, HORIZON, OUTPUT_FILE, assemble, discover_cities, fit_cities,
+)
+
+CACHE_DIR = "forecast_cache"
+MANIFEST_FILE = "manifest.json"
+CHANGES_FILE = "malaysia_predicted_aqi_changes.csv"
+
+# forecasts closer than this are treated as unchanged
+AQI_TOLERANCE = 1e-6
+
+
+def file_hash(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_manifest(cache_dir=CACHE_DIR):
+    path = os.path.join(cache_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_manifest(manifest, cache_dir=CACHE_DIR):
+    path = os.path.join(cache_dir, MANIFEST_FILE)
+    with open(path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def _key(state, city):
+    return f"{state}/{city}"
+
+
+def _cache_path(cache_dir, state, city):
+    return os.path.join(cache_dir, state, f"{city}.npz")
+
+
+def _read_cached(cache_dir, state, city):
+    with np.load(_cache_path(cache_dir, state, city)) as cached:
+        return cached["dates"], cached["aqi"], 0.0
+
+
+def _write_cached(cache_dir, state, city, dates, values):
+    path = _cache_path(cache_dir, state, city)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    np.savez(path, dates=dates, aqi=values)
+
+
+def changed_rows(state, city, old, new):
+    """
+    Rows of the new forecast that are new dates or differ from the old one
+    """
+    new_dates, new_values = new[0], new[1]
+    keep = np.ones(len(new_dates), dtype=bool)
+    if old is not None and len(old[0]):
+        old_dates, old_values = old[0], old[1]
+        position = np.minimum(np.searchsorted(old_dates, new_dates), len(old_dates) - 1)
+        same = (old_dates[position] == new_dates) & (np.abs(old_values[position] - new_values) <= AQI_TOLERANCE)
+        keep = ~same
+    return pd.DataFrame({"state": state, "city": city, "date": new_dates[keep], "aqi": new_values[keep]})
+
+
+def run_incremental(data_dir=DATA_DIR, output_file=OUTPUT_FILE, changes_file=CHANGES_FILE,
+                    model=DEFAULT_MODEL, horizon=HORIZON, workers=None, include_history=True,
+                    cache_dir=CACHE_DIR):
+    """
+    Refit only cities whose input or settings changed since the last run.
+    Writes the full forecast to output_file and only the changed rows to
+    changes_file. Returns (changed rows, stage timings, refitted city keys).
+    """
+    timings = {}
+    settings = {"model": model, "horizon": horizon, "include_history": include_history}
+
+    start = time.perf_counter()
+    tasks = discover_cities(data_dir)
+    manifest = load_manifest(cache_dir)
+    entries, stale = {}, []
+    for state, city, path in tasks:
+        key = _key(state, city)
+        entry = {"hash": file_hash(path), **settings}
+        entries[key] = entry
+        previous = manifest.get(key)
+        cached = os.path.exists(_cache_path(cache_dir, state, city))
+        if not cached or previous is None or any(previous.get(name) != value for name, value in entry.items()):
+            stale.append((state, city, path))
+    timings["hash"] = time.perf_counter() - start
+
+    fitted = fit_cities(stale, model, horizon, workers, include_history, timings)
+
+    start = time.perf_counter()
+    changes = []
+    for (state, city, _), result in zip(stale, fitted):
+        dates, values, _ = result
+        path = _cache_path(cache_dir, state, city)
+        old = _read_cached(cache_dir, state, city) if os.path.exists(path) else None
+        changes.append(changed_rows(state, city, old, result))
+        _write_cached(cache_dir, state, city, dates, values)
+    for key in manifest.keys() - entries.keys():
+        # the city's CSV is gone
+        state, city = key.split("/", 1)
+        if os.path.exists(_cache_path(cache_dir, state, city)):
+            os.remove(_cache_path(cache_dir, state, city))
+    timings["diff"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if output_file:
+        results = [_read_cached(cache_dir, state, city) for state, city, _ in tasks]
+        assemble(tasks, results).to_csv(output_file, index=False)
+    columns = ["state", "city", "date", "aqi"]
+    changes = pd.concat(changes, ignore_index=True) if changes else pd.DataFrame(columns=columns)
+    if changes_file:
+        changes.to_csv(changes_file, index=False)
+    os.makedirs(cache_dir, exist_ok=True)
+    save_manifest(entries, cache_dir)
+    timings["write"] = time.perf_counter() - start
+    return changes, timings, [_key(state, city) for state, city, _ in stale]
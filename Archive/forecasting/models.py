@@ -0,0 +1,107 @@
+"""
+Forecast model backends. Every model takes one city's daily series (no gaps)
+through fit(dates, values) and returns `horizon` future values from predict().
+"""
+import itertools
+
+import numpy as np
+import pandas as pd
+
+
+class SeasonalNaive:
+    """
+    Repeats the last observed season (a week by default)
+    """
+    def __init__(self, season=7):
+        self.season = season
+
+    def fit(self, dates, values):
+        self.last_season = values[-self.season:]
+        return self
+
+    def predict(self, horizon):
+        return np.resize(self.last_season, horizon).astype(np.float64)
+
+
+class ExponentialSmoothing:
+    """
+    Additive Holt-Winters with a damped trend; smoothing parameters are picked
+    from a small grid by in-sample one-step error
+    """
+    ALPHAS = (0.1, 0.3, 0.5)
+    BETAS = (0.01, 0.05)
+    GAMMAS = (0.05, 0.2)
+
+    def __init__(self, season=7, damping=0.98):
+        self.season = season
+        self.damping = damping
+
+    def _smooth(self, values, alpha, beta, gamma):
+        m, phi = self.season, self.damping
+        level = values[:m].mean()
+        trend = (values[m:2 * m].mean() - level) / m if len(values) >= 2 * m else 0.0
+        seasonal = list(values[:m] - level)
+        sse = 0.0
+        for t in range(m, len(values)):
+            s = seasonal[t - m]
+            error = values[t] - (level + phi * trend + s)
+            sse += error * error
+            previous = level
+            level = alpha * (values[t] - s) + (1 - alpha) * (previous + phi * trend)
+            trend = beta * (level - previous) + (1 - beta) * phi * trend
+            seasonal.append(gamma * (values[t] - level) + (1 - gamma) * s)
+        return sse, level, trend, seasonal[-m:]
+
+    def fit(self, dates, values):
+        if len(values) < 2 * self.season:
+            self.naive = SeasonalNaive(min(self.season, len(values))).fit(dates, values)
+            return self
+        self.naive = None
+        values = np.asarray(values, dtype=np.float64)
+        best = min(
+            (self._smooth(values, *params) + (params,) for params in
+             itertools.product(self.ALPHAS, self.BETAS, self.GAMMAS)),
+            key=lambda result: result[0],
+        )
+        _, self.level, self.trend, self.seasonal, self.params = best
+        return self
+
+    def predict(self, horizon):
+        if self.naive is not None:
+            return self.naive.predict(horizon)
+        steps = np.arange(1, horizon + 1)
+        # sum of phi^1..phi^h: the damped trend flattens out over long horizons
+        damped = np.cumsum(self.damping ** steps)
+        seasonal = np.resize(np.asarray(self.seasonal), horizon)
+        return np.maximum(self.level + damped * self.trend + seasonal, 0.0)
+
+
+class ProphetModel:
+    """
+    Prophet, as used by the original notebook (optional dependency)
+    """
+    def fit(self, dates, values):
+        try:
+            from prophet import Prophet
+        except ImportError:
+            raise ImportError("the prophet model needs `pip install prophet`") from None
+        self.model = Prophet()
+        self.model.fit(pd.DataFrame({"ds": pd.to_datetime(dates), "y": values}))
+        return self
+
+    def predict(self, horizon):
+        future = self.model.make_future_dataframe(periods=horizon, include_history=False)
+        return self.model.predict(future)["yhat"].to_numpy(dtype=np.float64)
+
+
+MODELS = {
+    "seasonal_naive": SeasonalNaive,
+    "ets": ExponentialSmoothing,
+    "prophet": ProphetModel,
+}
+
+
+def get_model(name):
+    if name not in MODELS:
+        raise ValueError(f"unknown model {name!r}, expected one of {', '.join(MODELS)}")
+    return MODELS[name]()
@@ -0,0 +1,168 @@
+"""
+Per-city forecasting over data/<state>/<city>.csv, fanned out over a process pool.
+Replaces the predict_aqi loop in user_3_2_data_proc.ipynb.
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from forecasting.models import get_model
+
+DATA_DIR = "data"
+OUTPUT_FILE = "malaysia_predicted_aqi.csv"
+HORIZON = 365
+DEFAULT_MODEL = "ets"
+
+
+def city_name(filename):
+    # data/Johor/Kota_Tinggi-air-quality.csv -> Kota_Tinggi
+    name = filename[:-len(".csv")] if filename.endswith(".csv") else filename
+    return name[:-len("-air-quality")] if name.endswith("-air-quality") else name
+
+
+def discover_cities(data_dir=DATA_DIR):
+    """
+    (state, city, path) for every city CSV, in a stable order
+    """
+    tasks = []
+    for state in sorted(os.listdir(data_dir)):
+        state_path = os.path.join(data_dir, state)
+        if not os.path.isdir(state_path):
+            continue
+        for filename in sorted(os.listdir(state_path)):
+            if filename.endswith(".csv"):
+                tasks.append((state, city_name(filename), os.path.join(state_path, filename)))
+    return tasks
+
+
+def read_history(path):
+    """
+    Observed (dates, aqi) of one city, sorted, one value per day: like
+    forecasting.history, the first valid row of a repeated date wins
+    """
+    df = pd.read_csv(path)
+    df.columns = df.columns.str.strip().str.lower()
+    dates = pd.to_datetime(df["date"], errors="coerce")
+    aqi = pd.to_numeric(df["aqi"], errors="coerce")
+    series = pd.Series(aqi.to_numpy(), index=dates).dropna()
+    # a stable sort keeps repeated dates in file order
+    series = series[series.index.notna()].sort_index(kind="stable")
+    series = series[~series.index.duplicated(keep="first")]
+    return series.index.to_numpy().astype("datetime64[D]"), series.to_numpy(dtype=np.float64)
+
+
+def load_series(source):
+    """
+    (dates, aqi) of one city from its CSV path or a (history_dir, state, city)
+    tuple naming it in the Parquet history dataset
+    """
+    if isinstance(source, tuple):
+        # imported here: forecasting.history builds on this module
+        from forecasting.history import city_history
+        directory, state, city = source
+        df = city_history(state, city, directory=directory)
+        return df["date"].to_numpy().astype("datetime64[D]"), df["aqi"].to_numpy(dtype=np.float64)
+    return read_history(source)
+
+
+def daily(dates, values):
+    # seasonal models assume one value per day: fill gaps linearly
+    index = pd.date_range(dates[0], dates[-1], freq="D")
+    series = pd.Series(values, index=pd.DatetimeIndex(dates)).reindex(index).interpolate()
+    return index.to_numpy().astype("datetime64[D]"), series.to_numpy()
+
+
+def forecast_city(task):
+    """
+    Fit one city and return (dates, aqi, seconds): the observed history followed by
+    `horizon` forecast days. Runs in a worker process.
+    """
+    path, model_name, horizon, include_history = task
+    start = time.perf_counter()
+    dates, values = load_series(path)
+    if len(values) == 0:
+        return np.array([], dtype="datetime64[D]"), np.array([]), time.perf_counter() - start
+    model = get_model(model_name).fit(*daily(dates, values))
+    future_dates = dates[-1] + np.arange(1, horizon + 1)
+    future_values = model.predict(horizon)
+    if include_history:
+        future_dates = np.concatenate([dates, future_dates])
+        future_values = np.concatenate([values, future_values])
+    return future_dates, future_values, time.perf_counter() - start
+
+
+def assemble(tasks, results):
+    """
+    One DataFrame (state, city, date, aqi) filled into preallocated columns
+    """
+    sizes = np.array([len(dates) for dates, _, _ in results], dtype=np.int64)
+    offsets = np.concatenate([[0], np.cumsum(sizes)])
+    states = pd.Categorical([state for state, _, _ in tasks])
+    cities = pd.Categorical([city for _, city, _ in tasks])
+    date_column = np.empty(offsets[-1], dtype="datetime64[D]")
+    aqi_column = np.empty(offsets[-1], dtype=np.float64)
+    for i, (dates, values, _) in enumerate(results):
+        date_column[offsets[i]:offsets[i + 1]] = dates
+        aqi_column[offsets[i]:offsets[i + 1]] = values
+    return pd.DataFrame({
+        "state": pd.Categorical.from_codes(np.repeat(states.codes, sizes), states.categories),
+        "city": pd.Categorical.from_codes(np.repeat(cities.codes, sizes), cities.categories),
+        "date": date_column,
+        "aqi": aqi_column,
+    })
+
+
+def fit_cities(tasks, model=DEFAULT_MODEL, horizon=HORIZON, workers=None, include_history=True, timings=None):
+    """
+    forecast_city() for every (state, city, path) task, in task order
+    """
+    timings = {} if timings is None else timings
+    jobs = [(path, model, horizon, include_history) for _, _, path in tasks]
+    start = time.perf_counter()
+    if workers == 1 or len(jobs) <= 1:
+        results = [forecast_city(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(forecast_city, jobs))
+    timings["fit"] = time.perf_counter() - start
+    timings["fit_cpu"] = sum(seconds for _, _, seconds in results)
+    return results
+
+
+def run_forecast(tasks, model=DEFAULT_MODEL, horizon=HORIZON, workers=None, include_history=True, timings=None):
+    """
+    Forecast the given (state, city, path) tasks; results keep the task order
+    """
+    timings = {} if timings is None else timings
+    results = fit_cities(tasks, model, horizon, workers, include_history, timings)
+    start = time.perf_counter()
+    df = assemble(tasks, results)
+    timings["assemble"] = time.perf_counter() - start
+    return df
+
+
+def run_pipeline(data_dir=DATA_DIR, output_file=OUTPUT_FILE, model=DEFAULT_MODEL, horizon=HORIZON,
+                 workers=None, include_history=True, history_dir=None):
+    """
+    Discover, forecast and write every city, reading the CSV archive or, with
+    history_dir, the Parquet history dataset. Returns (DataFrame, stage timings in seconds).
+    """
+    timings = {}
+    start = time.perf_counter()
+    if history_dir:
+        from forecasting.history import history_cities
+        tasks = [(state, city, (history_dir, state, city)) for state, city in history_cities(history_dir)]
+    else:
+        tasks = discover_cities(data_dir)
+    timings["discover"] = time.perf_counter() - start
+
+    df = run_forecast(tasks, model, horizon, workers, include_history, timings)
+
+    if output_file:
+        start = time.perf_counter()
+        df.to_csv(output_file, index=False)
+        timings["write"] = time.perf_counter() - start
+    return df, timings
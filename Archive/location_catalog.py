@@ -0,0 +1,221 @@
+"""
+Compact catalogue of every known city, merged from cities_with_lat_lon.csv
+(live monitoring) and perdicted_city_lat_lon.csv (forecast table). A forecast
+city is the same place as a live one when their names match once normalised or
+when they sit at the same coordinates in the same state (e.g. "Kulim" and
+"Kulim_Hi_Tech"); the live name is then the display name.
+
+Build the binary artefact once with `python location_catalog.py`; pages then
+load it with get_catalog(), which rebuilds it if the CSVs are newer.
+"""
+import os
+import pickle
+import sys
+import tempfile
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+LIVE_CSV = os.path.join(BASE_DIR, "cities_with_lat_lon.csv")
+FORECAST_CSV = os.path.join(BASE_DIR, "perdicted_city_lat_lon.csv")
+CATALOG_PATH = os.path.join(BASE_DIR, "location_catalog.pkl")
+
+LIVE = 1
+FORECAST = 2
+
+# Degrees within which a forecast city and a live city are the same place (~10 m)
+COORD_TOLERANCE = 1e-4
+
+# Bumped when build_catalog changes, so artefacts built by older code are rebuilt
+CATALOG_VERSION = 2
+
+
+def normalise_name(name):
+    """
+    Canonical display name: the forecast list uses underscores for spaces
+    """
+    return sys.intern(" ".join(str(name).replace("_", " ").split()))
+
+
+class LocationCatalog:
+    """
+    Interned state/city names with coordinates in contiguous arrays.
+    Row i describes city id i; all lookups are dict or array indexing.
+    """
+    def __init__(self, states, state_code, names, lat, lng, flags, forecast_keys):
+        self.states = states                    # list of state names
+        self.state_code = state_code            # int16 per city -> index into states
+        self.names = names                      # display name per city
+        self.lat = lat                          # float64 per city
+        self.lng = lng
+        self.flags = flags                      # uint8 bitmask of LIVE / FORECAST
+        self.forecast_keys = forecast_keys      # (state, city) as stored in air_quality, or None
+        self.version = CATALOG_VERSION
+        self._build_lookups()
+
+    def _build_lookups(self):
+        self.id_by_name = {}
+        self.ids_by_state = {state: [] for state in self.states}
+        self.id_by_forecast_key = {}
+        for i, name in enumerate(self.names):
+            state = self.states[self.state_code[i]]
+            self.id_by_name[(state, name)] = i
+            self.ids_by_state[state].append(i)
+            if self.forecast_keys[i] is not None:
+                self.id_by_forecast_key[self.forecast_keys[i]] = i
+        self.ids_by_state = {state: np.array(ids, dtype=np.int32) for state, ids in self.ids_by_state.items()}
+
+    def __len__(self):
+        return len(self.names)
+
+    def __getstate__(self):
+        # lookups are cheap to rebuild and keep the artefact small
+        return {k: v for k, v in self.__dict__.items() if k in
+                ("states", "state_code", "names", "lat", "lng", "flags", "forecast_keys", "version")}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.states = [sys.intern(s) for s in self.states]
+        self.names = [sys.intern(n) for n in self.names]
+        self._build_lookups()
+
+    def get(self, city_id):
+        return {
+            "Id": city_id,
+            "State": self.states[self.state_code[city_id]],
+            "City": self.names[city_id],
+            "Latitude": float(self.lat[city_id]),
+            "Longitude": float(self.lng[city_id]),
+        }
+
+    def find(self, state, city):
+        """
+        City id for a (state, city) pair in either naming style, or None
+        """
+        return self.id_by_name.get((normalise_name(state), normalise_name(city)))
+
+    def find_forecast(self, state, city):
+        return self.id_by_forecast_key.get((state, city))
+
+    def forecast_display(self, state, city):
+        """
+        Display (state, city) for a pair as stored in air_quality
+        """
+        i = self.id_by_forecast_key.get((state, city))
+        if i is None:
+            return normalise_name(state), normalise_name(city)
+        return self.states[self.state_code[i]], self.names[i]
+
+    def forecast_key(self, state, city):
+        """
+        The (state, city) pair stored in air_quality for a display pair, or None
+        """
+        i = self.find(state, city)
+        return None if i is None else self.forecast_keys[i]
+
+    def state_names(self, flag=LIVE):
+        return [s for s in self.states if (self.flags[self.ids_by_state[s]] & flag).any()]
+
+    def city_ids(self, state, flag=LIVE):
+        ids = self.ids_by_state.get(normalise_name(state), np.empty(0, dtype=np.int32))
+        return ids[(self.flags[ids] & flag) != 0]
+
+    def frame(self, flag=LIVE | FORECAST):
+        """
+        DataFrame view of the cities matching `flag`
+        """
+        ids = np.flatnonzero(self.flags & flag)
+        return pd.DataFrame({
+            "Id": ids,
+            "State": [self.states[c] for c in self.state_code[ids]],
+            "City": [self.names[i] for i in ids],
+            "Latitude": self.lat[ids],
+            "Longitude": self.lng[ids],
+            "live": (self.flags[ids] & LIVE) != 0,
+            "forecast": (self.flags[ids] & FORECAST) != 0,
+        })
+
+
+def build_catalog(live_csv=LIVE_CSV, forecast_csv=FORECAST_CSV):
+    """
+    Merge both city lists on normalised (state, city) names, then on
+    coordinates within COORD_TOLERANCE in the same state; live names and
+    coordinates win
+    """
+    merged = {}
+    for path, flag in ((live_csv, LIVE), (forecast_csv, FORECAST)):
+        frame = pd.read_csv(path)
+        for state, city, lat, lng in frame[["State", "City", "Latitude", "Longitude"]].itertuples(index=False):
+            key = (normalise_name(state), normalise_name(city))
+            if key not in merged and flag == FORECAST:
+                key = next((
+                    other for other, entry in merged.items()
+                    if other[0] == key[0] and entry["flags"] == LIVE
+                    and abs(entry["lat"] - lat) <= COORD_TOLERANCE and abs(entry["lng"] - lng) <= COORD_TOLERANCE
+                ), key)
+            entry = merged.setdefault(key, {"lat": lat, "lng": lng, "flags": 0, "forecast_key": None})
+            entry["flags"] |= flag
+            if flag == FORECAST:
+                entry["forecast_key"] = (state, city)
+
+    keys = sorted(merged)
+    states = sorted({state for state, _ in keys})
+    state_index = {state: i for i, state in enumerate(states)}
+    return LocationCatalog(
+        states=states,
+        state_code=np.array([state_index[state] for state, _ in keys], dtype=np.int16),
+        names=[city for _, city in keys],
+        lat=np.ascontiguousarray([merged[k]["lat"] for k in keys], dtype=np.float64),
+        lng=np.ascontiguousarray([merged[k]["lng"] for k in keys], dtype=np.float64),
+        flags=np.array([merged[k]["flags"] for k in keys], dtype=np.uint8),
+        forecast_keys=[merged[k]["forecast_key"] for k in keys],
+    )
+
+
+def save_catalog(catalog, path=CATALOG_PATH):
+    # a temporary file of its own per writer, renamed into place
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), prefix=".catalog-", delete=False) as f:
+        pickle.dump(catalog, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(f.name, path)
+
+
+def load_catalog(path=CATALOG_PATH):
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def _is_stale(path):
+    if not os.path.exists(path):
+        return True
+    built = os.path.getmtime(path)
+    return any(os.path.getmtime(csv) > built for csv in (LIVE_CSV, FORECAST_CSV))
+
+
+@lru_cache(maxsize=1)
+def get_catalog(path=CATALOG_PATH):
+    """
+    Process-wide catalogue, loaded from the artefact and rebuilt if it is stale
+    """
+    if not _is_stale(path):
+        try:
+            catalog = load_catalog(path)
+        except (AttributeError, EOFError, pickle.UnpicklingError):
+            catalog = None
+        if getattr(catalog, "version", None) == CATALOG_VERSION:
+            return catalog
+    catalog = build_catalog()
+    try:
+        save_catalog(catalog, path)
+    except OSError:
+        pass
+    return catalog
+
+
+if __name__ == "__main__":
+    # pickle the class under its importable name, not __main__
+    from location_catalog import build_catalog, save_catalog
+    catalog = build_catalog()
+    save_catalog(catalog)
+    print(f"Saved {len(catalog)} cities in {len(catalog.states)} states to {CATALOG_PATH}")
@@ -0,0 +1,196 @@
+"""
+Local stand-in for the IQAir and OpenWeather endpoints used by backend.py.
+
+Replays recorded responses from fixtures/ with configurable latency, error
+rate and throttling so load and resilience tests run offline:
+
+    python mock_provider.py --profile realistic --port 8765
+    IQAIR_BASE_URL=http://127.0.0.1:8765 OPENWEATHER_BASE_URL=http://127.0.0.1:8765 streamlit run landing.py
+
+With --record, requests are forwarded to the real providers and the
+responses are saved to the fixture files for later replay.
+"""
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+PROVIDERS = {
+    "/v2/nearest_city": {"name": "iqair", "upstream": "http://api.airvisual.com"},
+    "/data/2.5/air_pollution": {"name": "openweather", "upstream": "http://api.openweathermap.org"},
+}
+
+# latency_ms: mean delay, jitter_ms: +/- spread, error_rate: share of 500s,
+# rate_limit: requests per second before answering 429 (None = unlimited)
+PROFILES = {
+    "fast": {"latency_ms": 0, "jitter_ms": 0, "error_rate": 0.0, "rate_limit": None},
+    "realistic": {"latency_ms": 250, "jitter_ms": 150, "error_rate": 0.01, "rate_limit": None},
+    "flaky": {"latency_ms": 400, "jitter_ms": 300, "error_rate": 0.2, "rate_limit": None},
+    "throttled": {"latency_ms": 100, "jitter_ms": 50, "error_rate": 0.0, "rate_limit": 2},
+    "down": {"latency_ms": 0, "jitter_ms": 0, "error_rate": 1.0, "rate_limit": None},
+}
+
+ERROR_BODIES = {
+    "iqair": {400: {"status": "fail", "data": {"message": "invalid_coordinates"}},
+              500: {"status": "fail", "data": {"message": "server_error"}},
+              429: {"status": "fail", "data": {"message": "call_limit_reached"}}},
+    "openweather": {400: {"cod": "400", "message": "wrong latitude or longitude"},
+                    500: {"cod": 500, "message": "Internal error"},
+                    429: {"cod": 429, "message": "Your account is temporary blocked due to exceeding of requests limitation"}},
+}
+
+
+def error_body(provider, message):
+    """
+    An error payload shaped like the provider's own
+    """
+    if provider == "iqair":
+        return {"status": "fail", "data": {"message": message}}
+    return {"cod": "502", "message": message}
+
+
+def fixture_path(provider):
+    return os.path.join(FIXTURES_DIR, f"{provider}.json")
+
+
+def load_fixtures(provider):
+    path = fixture_path(provider)
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+
+class MockProvider:
+    """
+    Fixture store plus the latency/error/throttle behaviour of one server
+    """
+    def __init__(self, profile, record=False):
+        self.profile = profile
+        self.record = record
+        self.fixtures = {spec["name"]: load_fixtures(spec["name"]) for spec in PROVIDERS.values()}
+        self.lock = threading.Lock()
+        self.window_start = time.monotonic()
+        self.window_count = 0
+
+    def throttled(self):
+        limit = self.profile["rate_limit"]
+        if not limit:
+            return False
+        with self.lock:
+            now = time.monotonic()
+            if now - self.window_start >= 1:
+                self.window_start, self.window_count = now, 0
+            self.window_count += 1
+            return self.window_count > limit
+
+    def delay(self):
+        latency = self.profile["latency_ms"] + random.uniform(-1, 1) * self.profile["jitter_ms"]
+        if latency > 0:
+            time.sleep(latency / 1000)
+
+    def replay(self, provider, lat, lon):
+        """
+        The recorded response closest to (lat, lon)
+        """
+        entries = self.fixtures[provider]
+        if not entries:
+            return 404, {"message": f"no {provider} fixtures recorded"}
+        entry = min(entries, key=lambda e: (e["lat"] - lat) ** 2 + (e["lon"] - lon) ** 2)
+        return entry["status"], entry["body"]
+
+    def forward(self, spec, path, query, lat, lon):
+        try:
+            response = requests.get(f"{spec['upstream']}{path}?{query}", timeout=(3.05, 10))
+            body = response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            # nothing worth recording; tell the client what went wrong upstream
+            return 502, error_body(spec["name"], f"upstream request failed: {e}")
+        with self.lock:
+            entries = self.fixtures[spec["name"]]
+            entries[:] = [e for e in entries if (e["lat"], e["lon"]) != (lat, lon)]
+            entries.append({"lat": lat, "lon": lon, "status": response.status_code, "body": body})
+            os.makedirs(FIXTURES_DIR, exist_ok=True)
+            with open(fixture_path(spec["name"]), "w") as f:
+                json.dump(entries, f, indent=2)
+        return response.status_code, body
+
+
+def make_handler(mock):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            spec = PROVIDERS.get(url.path)
+            if spec is None:
+                return self.send_json(404, {"message": "unknown endpoint"})
+            params = parse_qs(url.query)
+            try:
+                lat, lon = float(params["lat"][0]), float(params["lon"][0])
+            except (KeyError, ValueError):
+                return self.send_json(400, ERROR_BODIES[spec["name"]][400])
+
+            if mock.record:
+                return self.send_json(*mock.forward(spec, url.path, url.query, lat, lon))
+            if mock.throttled():
+                return self.send_json(429, ERROR_BODIES[spec["name"]][429])
+            mock.delay()
+            if random.random() < mock.profile["error_rate"]:
+                return self.send_json(500, ERROR_BODIES[spec["name"]][500])
+            self.send_json(*mock.replay(spec["name"], lat, lon))
+
+        def send_json(self, status, body):
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(port=8765, profile="fast", record=False, **overrides):
+    """
+    Start the mock server in a background thread and return it (call .shutdown() to stop)
+    """
+    settings = dict(PROFILES[profile])
+    settings.update({k: v for k, v in overrides.items() if v is not None})
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(MockProvider(settings, record)))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock IQAir/OpenWeather provider")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="fast")
+    parser.add_argument("--latency-ms", type=float)
+    parser.add_argument("--jitter-ms", type=float)
+    parser.add_argument("--error-rate", type=float)
+    parser.add_argument("--rate-limit", type=float)
+    parser.add_argument("--record", action="store_true", help="forward to the real providers and save fixtures")
+    args = parser.parse_args()
+
+    server = serve(args.port, args.profile, args.record, latency_ms=args.latency_ms,
+                   jitter_ms=args.jitter_ms, error_rate=args.error_rate, rate_limit=args.rate_limit)
+    print(f"Mock provider on http://127.0.0.1:{args.port} ({'record' if args.record else args.profile})")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
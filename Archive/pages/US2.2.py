@@ -1,63 +1,101 @@
+import datetime
 import streamlit as st
 import pandas as pd
-import psycopg2
-import sqlalchemy
 import pydeck as pdk
+import numpy as np
+import sqlalchemy
+from accessory_functions import aqi_category_codes, aqi_rgba
+from location_catalog import FORECAST, get_catalog, normalise_name
+from database import DatabaseConfigError, get_engine
+from forecast_queries import load_ranked_forecast
+from forecast_snapshot import OFFLINE, load_ranked_snapshot, sync_snapshot
+from forecast_store import ForecastStore
+from route_planner import plan_route
+
+# How often each process pulls new forecast rows into the local snapshot
+SYNC_INTERVAL = 600
+
+
+# Forecast rows are read from the local Parquet snapshot (see forecast_snapshot.py);
+# the database is only needed to sync it and for the precomputed ranking. The page
+# only reads: tables, indexes and the ranking view are created by create_table.py
+# and the publish step (upload_csv.py). The shared pooled engine (see database.py)
+# is only created once the page goes online, so a missing configuration means offline
+@st.cache_data(ttl=SYNC_INTERVAL)
+def sync_forecast():
+    """False when running offline, unconfigured or the database is unreachable."""
+    if OFFLINE:
+        return False
+    try:
+        # serialised across processes; if another one is already syncing, use its result
+        sync_snapshot(get_engine(), wait=False)
+        return True
+    except (DatabaseConfigError, sqlalchemy.exc.SQLAlchemyError):
+        return False
+
+online = sync_forecast()
+
+
+def display_names(values):
+    """Map catalogue display names to the names stored in air_quality."""
+    return {normalise_name(value): value for value in values}
+
+
+def display_rows(df):
+    """Replace the names stored in air_quality by the catalogue's display names."""
+    catalog = get_catalog()
+    pairs = [catalog.forecast_display(state, city) for state, city in zip(df["State"], df["City"])]
+    df["State"] = pd.Series([state for state, _ in pairs], index=df.index, dtype=object)
+    df["City"] = pd.Series([city for _, city in pairs], index=df.index, dtype=object)
+    return df
 
-# 🔑 Database Credentials
-# DB_HOST = "fit5120-fit5120.e.aivencloud.com"
-# DB_PORT = "19305"
-# DB_NAME = "defaultdb"
-# DB_USER = "avnadmin"
-# DB_PASS = "AVNS_rEaABFKKIHR8O6Sxp6m"
-
-DB_HOST = "tm01onboarding-tm01onboarding.e.aivencloud.com"
-DB_PORT = "13812"
-DB_NAME = "defaultdb"
-DB_USER = "avnadmin"
-DB_PASS = "AVNS_AFmtCZU-RoKIAHPUNUx"
-
-
-# 📌 Function to Establish a Database Connection
-def get_db_connection():
-    conn = psycopg2.connect(
-        host=DB_HOST,
-        port=DB_PORT,
-        database=DB_NAME,
-        user=DB_USER,
-        password=DB_PASS
-    )
-    return conn
 
+# One compact, day-indexed copy of the snapshot per process, shared by all sessions
+@st.cache_resource(ttl=SYNC_INTERVAL)
+def load_store():
+    return ForecastStore.from_snapshot()
 
-# Create a database connection using SQLAlchemy
-DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-engine = sqlalchemy.create_engine(DATABASE_URL)
+store = load_store()
 
 
-def fetch_data(query_text):
-    query = sqlalchemy.text(query_text)
-    with engine.connect() as connection:
-        result = connection.execute(query)
-        data = pd.DataFrame(result, columns=["State", "City", "Date", "AQI"]) #"ID", 
-        return data
+def load_states(selected_date):
+    return display_names(store.states_on(selected_date))
 
 
-# 🔄 Load AQI Data from PostgreSQL
-@st.cache_data
-def load_data():
-    conn = get_db_connection()
-    query = "SELECT * FROM air_quality ORDER BY date DESC;"
-    df = fetch_data(query)
-    df["Date"] = pd.to_datetime(df["Date"]).dt.date
-    return df
+def load_cities(selected_date, db_states):
+    # by catalogue name, which can differ from the stored one ("Kulim_Hi_Tech" is Kulim)
+    df = store.select(selected_date, db_states)
+    catalog = get_catalog()
+    return {
+        catalog.forecast_display(state, city)[1]: city
+        for state, city in sorted(set(zip(df["State"], df["City"])))
+    }
+
+
+# 🔄 Load AQI Data for the selected date (an O(1) slice of the store)
+def load_data(selected_date, db_states, db_cities):
+    df = store.select(selected_date, db_states, db_cities)
+    # Use the catalogue's display names so they match the city coordinates
+    return display_rows(df)
 
-df = load_data()
+
+@st.cache_data(ttl=SYNC_INTERVAL)
+def load_ranking(selected_date, db_states, db_cities, online):
+    df = None
+    if online:
+        try:
+            df = load_ranked_forecast(get_engine(), selected_date, db_states, db_cities)
+        except (DatabaseConfigError, sqlalchemy.exc.SQLAlchemyError):
+            # no ranking view yet: rank the snapshot instead
+            pass
+    if df is None:
+        df = load_ranked_snapshot(selected_date, db_states, db_cities)
+    return display_rows(df)
 
 # Load predicted Data city locations
 @st.cache_data
 def load_city_cords():
-    city_df = pd.read_csv("perdicted_city_lat_lon.csv")  # Update with your file path
+    city_df = get_catalog().frame(FORECAST)[["State", "City", "Latitude", "Longitude"]]
     return city_df
 
 city_df = load_city_cords()
@@ -70,37 +108,32 @@ st.write("Check the air quality before planning your trip!")
 # Select travel date
 selected_date = st.date_input("📅 **Select Travel Date**")
 
-# Filter data based on date
-filtered_data = df[df["Date"] == selected_date]
-
 # Select state
-all_states = filtered_data["State"].unique()
-selected_states = st.multiselect("🌏 **Select State(s)**", all_states)
-
-# Filter by selected states
-filtered_data = filtered_data[filtered_data["State"].isin(selected_states)]
+state_options = load_states(selected_date)
+selected_states = st.multiselect("🌏 **Select State(s)**", list(state_options))
+db_states = tuple(state_options[state] for state in selected_states)
 
 # Select cities dynamically based on selected states
-all_cities = filtered_data["City"].unique()
-selected_cities = st.multiselect("🏙️ **Select City(ies)**", all_cities)
+city_options = load_cities(selected_date, db_states)
+selected_cities = st.multiselect("🏙️ **Select City(ies)**", list(city_options))
+db_cities = tuple(city_options[city] for city in selected_cities)
 
 # Filter by selected cities
 city_df_select = city_df[city_df["City"].isin(selected_cities)]
 # st.write(city_df_select)
 
-filtered_data = filtered_data[filtered_data["City"].isin(selected_cities)]
+filtered_data = load_data(selected_date, db_states, db_cities)
 # st.write(filtered_data)
 
 # merge aqi dataframe and coordinate dataframe
 df_merged = pd.merge(city_df_select, filtered_data, on=["State", "City"], how="left")
 # st.write(df_merged)
 
-# Sort cities by AQI (best to worst) and add ranking
-if not filtered_data.empty:
-    sorted_data = filtered_data.sort_values(by="AQI").reset_index(drop=True)
-    sorted_data.insert(0, "Rank", range(1, len(sorted_data) + 1))
-else:
-    sorted_data = pd.DataFrame()
+# Cities ranked by AQI (best to worst), precomputed per date in the database
+sorted_data = load_ranking(selected_date, db_states, db_cities, online)
+if not online:
+    st.caption("📴 Offline: showing the last synced forecast snapshot.")
+if sorted_data.empty:
     st.warning("⚠️ No data available for the selected date, state, or city!")
 
 # User input: child's asthma severity
@@ -115,17 +148,20 @@ if not sorted_data.empty:
     st.subheader("📊 **Recommended Cities (Best Air Quality First)**")
 
 
-    def highlight_aqi(val):
-        if val <= 50:
-            return 'background-color: lightgreen; color: black; font-weight: bold;'
-        elif val <= 100:
-            return 'background-color: yellow; color: black; font-weight: bold;'
-        return 'background-color: red; color: white; font-weight: bold;'
+    # Good / Moderate / anything worse, looked up for the whole column at once
+    AQI_CELL_STYLES = np.array([
+        'background-color: lightgreen; color: black; font-weight: bold;',
+        'background-color: yellow; color: black; font-weight: bold;',
+        'background-color: red; color: white; font-weight: bold;',
+    ])
+
+    def highlight_aqi(column):
+        return AQI_CELL_STYLES[np.minimum(aqi_category_codes(column), 2)]
 
 
     st.dataframe(
-        sorted_data[["Rank", "State", "City", "AQI"]]
-        .style.applymap(highlight_aqi, subset=['AQI'])
+        sorted_data[["National Rank", "State Rank", "State", "City", "AQI", "Category"]]
+        .style.apply(highlight_aqi, subset=['AQI'])
         .set_properties(**{'text-align': 'center'})
     )
 
@@ -142,6 +178,32 @@ if not sorted_data.empty:
     else:
         st.success("✅ Low risk: Outdoor activities are fine, but avoid pollution hotspots.")
 
+# Multi-day trip over the selected cities, one city per day (see route_planner.py)
+st.subheader("🗺️ **Plan a Multi-Day Trip**")
+city_pairs = list(zip(city_df["State"], city_df["City"]))
+start_city = st.selectbox("🚩 **Start From**", city_pairs, format_func=lambda pair: f"{pair[1]}, {pair[0]}")
+trip_dates = st.date_input(
+    "📆 **Trip Dates**",
+    value=(selected_date, selected_date + datetime.timedelta(days=len(selected_cities) - 1 if selected_cities else 2)),
+)
+candidates = [pair for pair in zip(city_df_select["State"], city_df_select["City"]) if pair != start_city]
+if isinstance(trip_dates, tuple) and len(trip_dates) == 2 and candidates:
+    dates = pd.date_range(trip_dates[0], trip_dates[1]).date
+    catalog = get_catalog()
+    db_pairs = [catalog.forecast_key(state, city) or (state, city) for state, city in candidates]
+    itinerary, summary = plan_route(start_city, candidates, dates, store.aqi_matrix(dates, db_pairs), asthma_severity)
+    if summary is not None:
+        if len(dates) > len(candidates):
+            st.caption(f"Only {len(candidates)} cities selected, so the trip covers the first {len(candidates)} days.")
+        st.dataframe(itinerary, hide_index=True)
+        st.caption(
+            f"{summary['distance_km']:.0f} km in total, "
+            + (f"average AQI {summary['mean_aqi']:.0f}, " if summary["mean_aqi"] is not None else "")
+            + f"planned with the {summary['method']} solver in {summary['ms']:.0f} ms."
+        )
+else:
+    st.info("Select the cities to visit and a start and end date to plan a trip.")
+
 # Asthma travel tips
 st.subheader("🚀 **Asthma Travel Tips**")
 st.markdown("""
@@ -163,6 +225,7 @@ df_merged_2 = pd.DataFrame({
     "longitude": df_merged["Longitude"].tolist(),
     "aqi": df_merged["AQI"].tolist()
 })
+df_merged_2["color"] = aqi_rgba(df_merged_2["aqi"]).tolist()
 
 
 # Define Pydeck Layer
@@ -170,7 +233,7 @@ layer = pdk.Layer(
     "ScatterplotLayer",
     data=df_merged_2,
     get_position=["longitude", "latitude"],  # Ensure correct order
-    get_color=["aqi * 2", "255 - (aqi * 2)", "0", "180"],  # Example color mapping
+    get_color="color",  # Precomputed RGBA per AQI band
     get_radius=20000,
     pickable=True
 )
@@ -0,0 +1,127 @@
+import logging
+import os
+import random
+import threading
+import time
+
+import streamlit as st
+
+from aqi_cache import TTL_SECONDS, get_cache
+from backend import fetch_many, is_error
+from location_catalog import LIVE, get_catalog
+
+# Refresh well before entries expire so known cities never go cold, unless the
+# call budget below needs longer cycles
+MIN_REFRESH_INTERVAL = int(TTL_SECONDS * 0.75)
+
+# Providers the refresher polls: "openweather" makes one OpenWeather call per city
+# and computes the AQI locally; "both" also asks IQAir, whose Community tier
+# allows only 500 calls a day for the refresher and user lookups together
+REFRESH_MODE = os.environ.get("AQI_REFRESH_MODE", "openweather")
+
+# Calls per day the refresher may make to each polled provider
+DAILY_CALL_BUDGETS = {"openweather": 2000, "both": 200}
+DAILY_CALL_BUDGET = int(os.environ.get("AQI_REFRESH_DAILY_CALLS", DAILY_CALL_BUDGETS.get(REFRESH_MODE, 200)))
+
+# Random spread (seconds) added between requests and to each cycle
+REQUEST_JITTER = 0.5
+CYCLE_JITTER = 60
+
+# Keep the background load small so user lookups still get provider quota
+MAX_CONCURRENCY = 4
+
+logger = logging.getLogger(__name__)
+
+
+def refresh_interval(city_count, budget=DAILY_CALL_BUDGET):
+    """
+    Seconds between cycles so that polling every city (one call per provider)
+    stays within the daily budget
+    """
+    return max(MIN_REFRESH_INTERVAL, int(24 * 60 * 60 * city_count / max(budget, 1)))
+
+
+def load_cities():
+    """
+    Live-monitoring cities from the location catalogue
+    """
+    return get_catalog().frame(LIVE)[["State", "City", "Latitude", "Longitude"]].to_dict(orient="records")
+
+
+class CityRefresher(threading.Thread):
+    """
+    Daemon thread that keeps the live reading of every known city in the cache.
+    Cities already refreshed recently (e.g. by another server process sharing
+    the cache file) are skipped.
+    """
+    def __init__(self, cities, cache=None, interval=None, mode=REFRESH_MODE):
+        super().__init__(name="aqi-refresher", daemon=True)
+        self.cities = cities
+        self.cache = cache or get_cache()
+        self.interval = interval or refresh_interval(len(cities))
+        self.mode = mode
+        self.stop_event = threading.Event()
+        self.last_cycle = None
+
+    def stale_cities(self):
+        now = time.time()
+        stale = []
+        for city in self.cities:
+            entry = self.cache.get(city["Latitude"], city["Longitude"])
+            if entry is None or now - entry[2] >= self.interval:
+                stale.append(city)
+        random.shuffle(stale)
+        return stale
+
+    def _jittered(self, cities):
+        for city in cities:
+            if self.stop_event.wait(random.uniform(0, REQUEST_JITTER)):
+                return
+            yield city
+
+    def refresh_once(self):
+        """
+        Refresh all stale cities, returns (refreshed, failed) counts
+        """
+        refreshed = failed = 0
+        for city, aqi, components in fetch_many(
+            self._jittered(self.stale_cities()), max_concurrency=MAX_CONCURRENCY, mode=self.mode
+        ):
+            if is_error(aqi) or is_error(components):
+                failed += 1
+                continue
+            self.cache.put(city["Latitude"], city["Longitude"], aqi, components)
+            refreshed += 1
+        self.last_cycle = {"time": time.time(), "refreshed": refreshed, "failed": failed}
+        return refreshed, failed
+
+    def run(self):
+        # spread start-up so several server processes don't poll in lockstep
+        if self.stop_event.wait(random.uniform(0, REQUEST_JITTER * 10)):
+            return
+        while not self.stop_event.is_set():
+            try:
+                self.refresh_once()
+            except Exception:
+                logger.exception("AQI refresh failed")
+            self.stop_event.wait(self.interval + random.uniform(0, CYCLE_JITTER))
+
+    def stop(self):
+        self.stop_event.set()
+
+
+def start_refresher(interval=None):
+    """
+    Start a background refresher; pages use start_background_refresh instead
+    """
+    refresher = CityRefresher(load_cities(), interval=interval)
+    refresher.start()
+    return refresher
+
+
+@st.cache_resource
+def start_background_refresh():
+    """
+    The one refresher of this server, shared by every page that calls it
+    """
+    return start_refresher()
@@ -0,0 +1,243 @@
+"""
+Multi-day itinerary planner: visit one candidate city per day, leaving from a
+start city, so that forecast AQI exposure (weighted by asthma severity) plus
+travel distance is as small as possible.
+
+    cost = sum over days of  severity_weight * AQI[city, day]
+                           + DISTANCE_WEIGHT * km travelled to reach that city
+
+Up to EXACT_LIMIT candidates are solved exactly with a subset DP (Held-Karp
+with the day given by the subset size); larger sets use a greedy start
+improved by local search, restarted from perturbations for SEARCH_BUDGET.
+"""
+import time
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from location_catalog import FORECAST, get_catalog
+from spatial_index import haversine_km
+
+SEVERITY_WEIGHTS = {"Mild": 0.5, "Moderate": 1.0, "Severe": 2.0}
+# AQI points one kilometre of travel is worth: 100 km ~ 10 AQI points
+DISTANCE_WEIGHT = 0.1
+# stand-in for days without a forecast, so the planner avoids them
+MISSING_AQI = 500.0
+EXACT_LIMIT = 10
+# local search stops after this many seconds; with the exact solver's worst
+# case at EXACT_LIMIT both stay inside an interactive 200 ms
+SEARCH_BUDGET = 0.1
+
+
+@lru_cache(maxsize=1)
+def city_distances():
+    """
+    Great-circle distances between every forecast city, computed once.
+    Returns ({(state, city): row}, km matrix).
+    """
+    frame = get_catalog().frame(FORECAST)
+    lat = frame["Latitude"].to_numpy()
+    lng = frame["Longitude"].to_numpy()
+    matrix = haversine_km(lat[:, None], lng[:, None], lat[None, :], lng[None, :]).astype(np.float32)
+    index = {key: i for i, key in enumerate(zip(frame["State"], frame["City"]))}
+    return index, matrix
+
+
+def _route_cost(route, travel, exposure):
+    # travel rows/columns: 0 is the start city, candidate i is i + 1
+    stops = np.concatenate([[0], np.asarray(route) + 1])
+    return float(travel[stops[:-1], stops[1:]].sum() + exposure[route, np.arange(len(route))].sum())
+
+
+def solve_exact(travel, exposure):
+    """
+    Optimal route over subsets: best[mask, j] is the cheapest way to spend the
+    first popcount(mask) days visiting `mask`, ending in j
+    """
+    n, days = exposure.shape
+    size = 1 << n
+    best = np.full((size, n), np.inf)
+    parent = np.full((size, n), -1, dtype=np.int16)
+    singles = 1 << np.arange(n)
+    best[singles, np.arange(n)] = travel[0, 1:] + exposure[:, 0]
+    hops = travel[1:, 1:]
+
+    popcount = np.array([bin(mask).count("1") for mask in range(size)])
+    for mask in np.flatnonzero((popcount >= 1) & (popcount < days)):
+        inside = (mask & singles) != 0
+        ends = np.flatnonzero(inside & np.isfinite(best[mask]))
+        if len(ends) == 0:
+            continue
+        # cheapest previous city for every possible next city at once
+        through = best[mask, ends][:, None] + hops[ends]
+        previous = ends[np.argmin(through, axis=0)]
+        cost = through.min(axis=0) + exposure[:, popcount[mask]]
+        nxt = np.flatnonzero(~inside)
+        targets = mask | singles[nxt]
+        better = cost[nxt] < best[targets, nxt]
+        best[targets[better], nxt[better]] = cost[nxt][better]
+        parent[targets[better], nxt[better]] = previous[nxt][better]
+
+    finals = np.flatnonzero(popcount == days)
+    mask, last = np.unravel_index(np.argmin(best[finals]), (len(finals), n))
+    mask = finals[mask]
+    route = []
+    while last >= 0:
+        route.append(int(last))
+        mask, last = mask ^ (1 << last), parent[mask, last]
+    return route[::-1]
+
+
+def _move_deltas(route, travel, exposure, used):
+    """
+    Cost change of every replace, swap and reversal move on `route`, each an
+    O(1) edge/exposure difference, scored for all moves at once. Returns the
+    best move as (delta, kind, a, b).
+    """
+    n, days = exposure.shape
+    # stop 0 is the start city; a zero-cost dummy after the last day gives every stop a successor
+    dummy = n + 1
+    cost = np.zeros((n + 2, n + 2))
+    cost[:n + 1, :n + 1] = travel
+    stops = np.concatenate([[0], np.asarray(route) + 1, [dummy]])
+    # day_cost[a, k]: exposure of the city visited on day a if it were visited on day k
+    day_cost = exposure[route]
+    moves = []
+
+    unused = np.flatnonzero(~used)
+    if len(unused):
+        before, here, after = stops[:-2], stops[1:-1], stops[2:]
+        candidate = unused[None, :] + 1
+        delta = (cost[before[:, None], candidate] + cost[candidate, after[:, None]]
+                 - (cost[before, here] + cost[here, after])[:, None]
+                 + exposure[unused].T[:days] - np.diag(day_cost)[:, None])
+        day, k = np.unravel_index(np.argmin(delta), delta.shape)
+        moves.append((delta[day, k], "replace", int(day), int(unused[k])))
+
+    if days > 1:
+        i, j = np.triu_indices(days, 1)
+        p, q = i + 1, j + 1
+        diagonal = np.diag(day_cost)
+        # swap the cities of days i and j
+        adjacent = q == p + 1
+        old = cost[stops[p - 1], stops[p]] + cost[stops[q], stops[q + 1]] + np.where(
+            adjacent, cost[stops[p], stops[q]], cost[stops[p], stops[p + 1]] + cost[stops[q - 1], stops[q]])
+        new = cost[stops[p - 1], stops[q]] + cost[stops[p], stops[q + 1]] + np.where(
+            adjacent, cost[stops[q], stops[p]], cost[stops[q], stops[p + 1]] + cost[stops[q - 1], stops[p]])
+        swap = new - old + day_cost[j, i] + day_cost[i, j] - diagonal[i] - diagonal[j]
+        best = int(np.argmin(swap))
+        moves.append((swap[best], "swap", int(i[best]), int(j[best])))
+
+        # reverse days i..j: with symmetric travel only the two end edges change,
+        # and the new exposure is an anti-diagonal sum of day_cost
+        offset = np.arange(days)
+        anti = np.zeros((2 * days - 1, days + 1))
+        rows = offset[:, None] + offset[None, :]
+        np.add.at(anti, (rows, np.broadcast_to(offset + 1, (days, days))), day_cost)
+        anti = np.cumsum(anti, axis=1)
+        straight = np.concatenate([[0], np.cumsum(diagonal)])
+        reverse = (cost[stops[p - 1], stops[q]] + cost[stops[p], stops[q + 1]]
+                   - cost[stops[p - 1], stops[p]] - cost[stops[q], stops[q + 1]]
+                   + anti[i + j, j + 1] - anti[i + j, i] - (straight[j + 1] - straight[i]))
+        best = int(np.argmin(reverse))
+        moves.append((reverse[best], "reverse", int(i[best]), int(j[best])))
+
+    return min(moves, key=lambda move: move[0]) if moves else None
+
+
+def _local_search(route, used, travel, exposure, deadline):
+    # apply the best improving move until none is left or time runs out
+    while time.perf_counter() < deadline:
+        move = _move_deltas(route, travel, exposure, used)
+        if move is None or move[0] >= -1e-9:
+            break
+        _, kind, a, b = move
+        if kind == "replace":
+            used[route[a]], used[b] = False, True
+            route[a] = b
+        elif kind == "swap":
+            route[a], route[b] = route[b], route[a]
+        else:
+            route[a:b + 1] = route[a:b + 1][::-1]
+    return route
+
+
+def solve_heuristic(travel, exposure, budget=SEARCH_BUDGET, seed=0):
+    """
+    Greedy day-by-day choice, then local search (replace a stop with an unused
+    city, swap two stops, reverse a stretch). Until `budget` seconds have passed
+    the best route is perturbed at random and searched again. `travel` must be
+    symmetric.
+    """
+    n, days = exposure.shape
+    route, used, here = [], np.zeros(n, dtype=bool), 0
+    for day in range(days):
+        cost = np.where(used, np.inf, travel[here, 1:] + exposure[:, day])
+        city = int(np.argmin(cost))
+        route.append(city)
+        used[city] = True
+        here = city + 1
+
+    deadline = time.perf_counter() + budget
+    best = _local_search(route, used, travel, exposure, deadline)
+    best_cost = _route_cost(best, travel, exposure)
+    rng = np.random.default_rng(seed)
+    while time.perf_counter() < deadline:
+        route = list(best)
+        used = np.zeros(n, dtype=bool)
+        used[route] = True
+        if days > 1:
+            a, b = rng.choice(days, 2, replace=False)
+            route[a], route[b] = route[b], route[a]
+        if days < n:
+            day, city = int(rng.integers(days)), int(rng.choice(np.flatnonzero(~used)))
+            used[route[day]], used[city] = False, True
+            route[day] = city
+        route = _local_search(route, used, travel, exposure, deadline)
+        cost = _route_cost(route, travel, exposure)
+        if cost < best_cost - 1e-9:
+            best, best_cost = route, cost
+    return best
+
+
+def plan_route(start, candidates, dates, aqi, severity="Moderate"):
+    """
+    Itinerary visiting one candidate (state, city) per date, leaving from `start`.
+    `aqi` is the (len(candidates), len(dates)) forecast matrix, NaN where missing.
+    With more dates than candidates only the first len(candidates) dates are planned.
+    Returns (itinerary DataFrame, summary dict).
+    """
+    started = time.perf_counter()
+    index, distances = city_distances()
+    days = min(len(dates), len(candidates))
+    if days == 0:
+        return pd.DataFrame(columns=["Day", "Date", "State", "City", "AQI", "Travel (km)"]), None
+    rows = [index[start]] + [index[city] for city in candidates]
+    km = distances[np.ix_(rows, rows)].astype(np.float64)
+    forecast = np.asarray(aqi, dtype=np.float64)[:, :days]
+    exposure = SEVERITY_WEIGHTS[severity] * np.where(np.isnan(forecast), MISSING_AQI, forecast)
+    travel = DISTANCE_WEIGHT * km
+
+    if len(candidates) <= EXACT_LIMIT:
+        route, method = solve_exact(travel, exposure), "exact"
+    else:
+        route, method = solve_heuristic(travel, exposure), "heuristic"
+
+    stops = [0] + [city + 1 for city in route]
+    itinerary = pd.DataFrame({
+        "Day": np.arange(1, days + 1),
+        "Date": list(dates[:days]),
+        "State": [candidates[city][0] for city in route],
+        "City": [candidates[city][1] for city in route],
+        "AQI": forecast[route, np.arange(days)],
+        "Travel (km)": km[stops[:-1], stops[1:]].round(1),
+    })
+    summary = {
+        "method": method,
+        "cost": _route_cost(route, travel, exposure),
+        "distance_km": float(itinerary["Travel (km)"].sum()),
+        "mean_aqi": float(np.nanmean(itinerary["AQI"])) if days and not itinerary["AQI"].isna().all() else None,
+        "ms": (time.perf_counter() - started) * 1000,
+    }
+    return itinerary, summary
@@ -0,0 +1,147 @@
+import heapq
+import math
+from functools import lru_cache
+
+import numpy as np
+
+from location_catalog import get_catalog
+
+EARTH_RADIUS_KM = 6371.0088
+
+# GPS fixes within this distance are snapped to the nearest known city
+SNAP_RADIUS_KM = 15
+
+
+def to_unit_vectors(lat, lng):
+    """
+    Map degrees to 3D points on the unit sphere; straight-line (chord)
+    distance between them grows monotonically with great-circle distance
+    """
+    lat = np.radians(np.asarray(lat, dtype=np.float64))
+    lng = np.radians(np.asarray(lng, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.stack([cos_lat * np.cos(lng), cos_lat * np.sin(lng), np.sin(lat)], axis=-1)
+
+
+def chord_to_km(chord):
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(np.asarray(chord) / 2, 0, 1))
+
+
+def km_to_chord(km):
+    return 2 * math.sin(min(km / EARTH_RADIUS_KM, math.pi) / 2)
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """
+    Vectorized great-circle distance; broadcasts like any NumPy expression
+    """
+    lat1, lng1, lat2, lng2 = map(np.radians, (lat1, lng1, lat2, lng2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+class SpatialIndex:
+    """
+    KD-tree over unit-sphere coordinates giving haversine nearest and radius queries.
+    `records` is a DataFrame with Latitude and Longitude columns; query results
+    refer back to its rows.
+    """
+    def __init__(self, records):
+        self.records = records.reset_index(drop=True)
+        self.points = to_unit_vectors(self.records["Latitude"], self.records["Longitude"])
+        n = len(self.points)
+        # node i stores a point index, split axis and child node ids (-1 = none)
+        self.node_point = np.empty(n, dtype=np.int64)
+        self.node_axis = np.empty(n, dtype=np.int8)
+        self.node_left = np.full(n, -1, dtype=np.int64)
+        self.node_right = np.full(n, -1, dtype=np.int64)
+        self._size = 0
+        self.root = self._build(np.arange(n))
+
+    def _build(self, idx):
+        if len(idx) == 0:
+            return -1
+        spread = self.points[idx].max(axis=0) - self.points[idx].min(axis=0)
+        axis = int(np.argmax(spread))
+        idx = idx[np.argsort(self.points[idx, axis], kind="stable")]
+        mid = len(idx) // 2
+        node = self._size
+        self._size += 1
+        self.node_point[node] = idx[mid]
+        self.node_axis[node] = axis
+        self.node_left[node] = self._build(idx[:mid])
+        self.node_right[node] = self._build(idx[mid + 1:])
+        return node
+
+    def _search(self, target, k, max_chord):
+        # max-heap of (-distance, point) holding the best k candidates
+        best = []
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if node < 0:
+                continue
+            point = self.node_point[node]
+            diff = self.points[point] - target
+            dist = math.sqrt(diff @ diff)
+            if dist <= max_chord:
+                if len(best) < k:
+                    heapq.heappush(best, (-dist, point))
+                elif dist < -best[0][0]:
+                    heapq.heapreplace(best, (-dist, point))
+            axis = self.node_axis[node]
+            delta = target[axis] - self.points[point, axis]
+            near, far = (self.node_left[node], self.node_right[node]) if delta < 0 else (self.node_right[node], self.node_left[node])
+            bound = max_chord if len(best) < k else min(max_chord, -best[0][0])
+            if abs(delta) <= bound:
+                stack.append(far)
+            stack.append(near)
+        return sorted((-d, p) for d, p in best)
+
+    def nearest(self, lat, lng, k=1, max_km=None):
+        """
+        The k closest records as a DataFrame with a distance_km column
+        """
+        max_chord = km_to_chord(max_km) if max_km is not None else 2.0
+        found = self._search(to_unit_vectors(lat, lng), k, max_chord)
+        return self._result(found)
+
+    def within_radius(self, lat, lng, radius_km):
+        """
+        All records within radius_km, closest first
+        """
+        found = self._search(to_unit_vectors(lat, lng), len(self.records), km_to_chord(radius_km))
+        return self._result(found)
+
+    def _result(self, found):
+        rows = self.records.iloc[[p for _, p in found]].copy()
+        rows["distance_km"] = chord_to_km([d for d, _ in found])
+        return rows
+
+
+def load_known_cities():
+    """
+    Every catalogued city with a `source` column ("live" when the refresher keeps it warm)
+    """
+    cities = get_catalog().frame()
+    cities["source"] = np.where(cities["live"], "live", "forecast")
+    return cities
+
+
+@lru_cache(maxsize=1)
+def get_city_index():
+    return SpatialIndex(load_known_cities())
+
+
+def snap_to_city(lat, lng, max_km=SNAP_RADIUS_KM):
+    """
+    Replace a raw GPS fix by the nearest known city so users share cache
+    entries. Cities the live refresher keeps warm are preferred when they are
+    within range. Returns (lat, lng, city_row) or the input and None.
+    """
+    nearby = get_city_index().nearest(lat, lng, k=4, max_km=max_km)
+    if nearby.empty:
+        return lat, lng, None
+    live = nearby[nearby["source"] == "live"]
+    city = (live if not live.empty else nearby).iloc[0]
+    return float(city["Latitude"]), float(city["Longitude"]), city
@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+from aqi_engine import UGM3_TO_UNIT, aqi_from_components, compute_aqi, sub_index
+
+
+def o3_index(ppb):
+    return float(sub_index("o3", ppb / UGM3_TO_UNIT["o3"]))
+
+
+@pytest.mark.parametrize("ppb, expected", [
+    (54, 50), (55, 51), (200, 300), (201, 300), (404, 300),
+    (405, 301), (504, 400), (505, 401), (604, 500), (700, 500),
+])
+def test_o3_band_edges(ppb, expected):
+    assert o3_index(ppb) == expected
+
+
+def test_o3_index_never_decreases():
+    ppb = np.arange(0, 700)
+    index = sub_index("o3", ppb / UGM3_TO_UNIT["o3"])
+    assert np.all(np.diff(index) >= 0)
+
+
+def test_no_main_pollutant_without_aqi():
+    result = compute_aqi({"pm2_5": [np.nan, -1.0, 12.0], "o3": [np.nan, np.nan, np.nan]})
+    assert np.isnan(result["aqi"][:2]).all()
+    assert list(result["main_pollutant"]) == [None, None, "p2"]
+    assert aqi_from_components({"pm2_5": np.nan}) == (None, None)
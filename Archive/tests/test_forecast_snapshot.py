@@ -0,0 +1,26 @@
+import datetime
+
+import pandas as pd
+import sqlalchemy
+
+from forecast_loader import load_forecast_frame
+from forecast_snapshot import _scan, sync_snapshot
+
+START = datetime.date(2026, 1, 10)
+
+
+def forecast(aqi):
+    dates = [START + datetime.timedelta(days=i) for i in range(len(aqi))]
+    return pd.DataFrame({"state": "Kedah", "city": "Kulim_Hi_Tech", "date": dates, "aqi": aqi})
+
+
+def test_sync_picks_up_upserts_on_earlier_dates(tmp_path):
+    engine = sqlalchemy.create_engine(f"sqlite:///{tmp_path / 'forecast.db'}")
+    directory = str(tmp_path / "snapshot")
+    load_forecast_frame(engine, forecast([10.0, 20.0, 30.0]))
+    assert len(sync_snapshot(engine, directory)["written"]) == 3
+    assert sync_snapshot(engine, directory)["written"] == []
+
+    load_forecast_frame(engine, forecast([15.0, 20.0, 30.0]))
+    assert sync_snapshot(engine, directory)["written"] == [START]
+    assert _scan(START, directory=directory).column("aqi").to_pylist() == [15.0]
@@ -0,0 +1,30 @@
+import numpy as np
+
+from forecasting.history import city_history, ingest_history
+from forecasting.pipeline import read_history
+
+CSV = """date, pm25, aqi
+2024/1/3, 40, 60
+2024/1/1, 10, 20
+2024/1/2, 30, 50
+2024/1/1, 99, 99
+2024/1/2, , not-a-number
+"""
+
+
+def test_ingest_and_read_history_keep_the_same_duplicate(tmp_path):
+    data_dir = tmp_path / "data" / "Johor"
+    data_dir.mkdir(parents=True)
+    path = data_dir / "Kluang-air-quality.csv"
+    path.write_text(CSV)
+
+    dates, aqi = read_history(path)
+    out_dir = str(tmp_path / "history")
+    # chunks of two rows put the repeated 2024/1/1 in a later chunk
+    stats = ingest_history(str(tmp_path / "data"), out_dir, chunk_rows=2)
+    history = city_history("Johor", "Kluang", directory=out_dir)
+
+    assert stats["duplicates"] == 1
+    assert list(aqi) == [20.0, 50.0, 60.0]
+    assert np.array_equal(history["date"].to_numpy().astype("datetime64[D]"), dates)
+    assert np.array_equal(history["aqi"].to_numpy(dtype=np.float64), aqi)
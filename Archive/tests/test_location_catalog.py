@@ -0,0 +1,32 @@
+import os
+
+import pandas as pd
+
+from location_catalog import FORECAST, LIVE, build_catalog, load_catalog, save_catalog
+
+
+def test_no_duplicate_coordinates():
+    frame = build_catalog().frame()
+    assert not frame[["Latitude", "Longitude"]].round(4).duplicated().any()
+
+
+def test_same_place_keeps_live_name_and_forecast_key():
+    catalog = build_catalog()
+    i = catalog.find_forecast("Kedah", "Kulim_Hi_Tech")
+    assert catalog.names[i] == "Kulim"
+    assert catalog.flags[i] == LIVE | FORECAST
+    assert catalog.forecast_display("Kedah", "Kulim_Hi_Tech") == ("Kedah", "Kulim")
+    assert catalog.forecast_key("Kedah", "Kulim") == ("Kedah", "Kulim_Hi_Tech")
+
+
+def test_every_forecast_city_is_kept():
+    catalog = build_catalog()
+    forecast = pd.read_csv(os.path.join(os.path.dirname(__file__), "..", "perdicted_city_lat_lon.csv"))
+    assert len(catalog.frame(FORECAST)) == len(forecast)
+
+
+def test_save_catalog_round_trip(tmp_path):
+    path = str(tmp_path / "catalog.pkl")
+    save_catalog(build_catalog(), path)
+    assert os.listdir(tmp_path) == ["catalog.pkl"]
+    assert len(load_catalog(path)) == len(build_catalog())
@@ -0,0 +1,79 @@
+import datetime
+import itertools
+import time
+
+import numpy as np
+import pytest
+
+import route_planner
+from route_planner import EXACT_LIMIT, _route_cost, city_distances, plan_route, solve_exact, solve_heuristic
+
+# what the page must answer within; only asserted by the benchmark
+INTERACTIVE_MS = 200
+
+
+def random_problem(rng, candidates, days):
+    points = rng.random((candidates + 1, 2)) * 500
+    travel = 0.1 * np.linalg.norm(points[:, None] - points[None], axis=2)
+    return travel, rng.random((candidates, days)) * 200
+
+
+def brute_force(travel, exposure):
+    candidates, days = exposure.shape
+    return min(_route_cost(list(route), travel, exposure)
+               for route in itertools.permutations(range(candidates), days))
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_exact_matches_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    candidates = int(rng.integers(2, 8))
+    travel, exposure = random_problem(rng, candidates, int(rng.integers(1, candidates + 1)))
+    assert _route_cost(solve_exact(travel, exposure), travel, exposure) == pytest.approx(brute_force(travel, exposure))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_heuristic_visits_distinct_cities_close_to_optimum(seed):
+    rng = np.random.default_rng(seed)
+    travel, exposure = random_problem(rng, EXACT_LIMIT, 8)
+    route = solve_heuristic(travel, exposure)
+    assert len(route) == 8 and len(set(route)) == 8
+    optimum = _route_cost(solve_exact(travel, exposure), travel, exposure)
+    assert _route_cost(route, travel, exposure) <= optimum * 1.05
+
+
+def test_heuristic_stops_at_its_deadline(monkeypatch):
+    # a clock that advances 1 ms per reading, so the search never ends on its own first
+    ticks = itertools.count()
+    monkeypatch.setattr(route_planner.time, "perf_counter", lambda: next(ticks) / 1000)
+    travel, exposure = random_problem(np.random.default_rng(0), 60, 30)
+    route = solve_heuristic(travel, exposure, budget=0.05)
+    assert len(set(route)) == 30
+    # one reading per step, so it stopped within a couple of steps of the deadline
+    assert next(ticks) <= 55
+
+
+def plan_all_days(candidates):
+    index, _ = city_distances()
+    cities = list(index)
+    start, candidates = cities[0], cities[1:candidates + 1 if candidates else None]
+    dates = [datetime.date(2025, 1, 1) + datetime.timedelta(days=i) for i in range(len(candidates))]
+    aqi = np.random.default_rng(0).random((len(candidates), len(dates))) * 150
+    return candidates, dates, plan_route(start, candidates, dates, aqi, "Severe")
+
+
+@pytest.mark.parametrize("candidates", [EXACT_LIMIT, None])
+def test_plan_route_visits_a_city_per_day(candidates):
+    candidates, dates, (itinerary, summary) = plan_all_days(candidates)
+    assert summary["method"] == ("exact" if len(candidates) <= EXACT_LIMIT else "heuristic")
+    assert len(itinerary) == len(dates)
+    assert itinerary[["State", "City"]].drop_duplicates().shape[0] == len(dates)
+
+
+# wall-clock time depends on the machine: run with `pytest -m benchmark`
+@pytest.mark.benchmark
+@pytest.mark.parametrize("candidates", [EXACT_LIMIT, None])
+def test_plan_route_is_interactive(candidates):
+    began = time.perf_counter()
+    plan_all_days(candidates)
+    assert (time.perf_counter() - began) * 1000 < INTERACTIVE_MS
@@ -1,8 +1,10 @@
 import streamlit as st
-from backend import aqi_and_components
+from backend import cached_aqi_and_components,is_error
 from streamlit_js_eval import get_geolocation
 from accessory_functions import *
 from educational_insight import display_educational_insights
+from refresher import start_background_refresh
+from spatial_index import snap_to_city
 from aqi_map import display_aqi_map,display_heatmap
 
 @st.cache_data
@@ -10,10 +12,10 @@ def cached_get_locations():
     """Caches location retrieval to avoid recomputation."""
     return getting_locations()
 
-@st.cache_data
 def cached_get_air_quality_data(lat, lng):
-    """Caches AQI data for a given location to minimize API calls."""
-    return aqi_and_components(lat, lng)
+    """Serves AQI data for the nearest known city from the shared backend cache to minimize API calls."""
+    lat, lng, _ = snap_to_city(lat, lng)
+    return cached_aqi_and_components(lat, lng)
 
 # Apply custom CSS for the selected UI elements
 st.markdown("""
@@ -56,8 +58,22 @@ st.markdown("""
 
 
 
+@st.fragment
+def display_map_section(location, aqi_data, components):
+    """
+    Map with its own type switch: changing it reruns only this fragment, not the
+    insights above (fragments cannot place widgets in the sidebar)
+    """
+    map_type = st.radio("Select Map Type", ["AQI", "Pollutant Levels"], horizontal=True)
+    if map_type == 'AQI':
+        display_aqi_map(location, aqi_data)
+    else:
+        display_heatmap(location, components)
+
+
 def main():
     st.title("Air Quality and Asthma Educational Insights")
+    start_background_refresh()
 
     # Sidebar - User Input
     st.sidebar.header("Location Settings")
@@ -69,8 +85,6 @@ def main():
 
     city = "Select a city"
 
-    map_type = st.sidebar.radio("Select Map Type", ["AQI", "Pollutant Levels"])
-
     if use_auto_location:
     # if st.sidebar.button('Use My Location'):
         #location = streamlit_geolocation()
@@ -103,21 +117,23 @@ def main():
                 return
 
             aqi, components = cached_get_air_quality_data(lat,lng)
-            if aqi and components:
+            if is_error(components):
+                # Partial result: keep the AQI reading, insights show their own notice
+                components = None
+            if not is_error(aqi):
                 st.session_state.aqi_data = aqi
                 st.session_state.components_data = components
                 st.session_state.location = (lat,lng)
                 st.session_state.map_updated = True
+            elif isinstance(aqi, dict):
+                st.error(aqi['error'])
             else:
-                st.error('No data available')
+                st.error(aqi or 'No data available')
 
     # Main content area - Display educational insights
     if 'aqi_data' in st.session_state and 'components_data' in st.session_state and 'location' in st.session_state:
         display_educational_insights(st.session_state.aqi_data, st.session_state.components_data)
-        if map_type == 'AQI':
-            display_aqi_map(st.session_state.location, st.session_state.aqi_data)
-        else:
-            display_heatmap(st.session_state.location,st.session_state.components_data)
+        display_map_section(st.session_state.location, st.session_state.aqi_data, st.session_state.components_data)
 
 
 
@@ -1,16 +1,9 @@
-from sqlalchemy import create_engine
+from database import get_engine, pool_stats
 import pandas as pd
+from forecast_publish import publish_forecast_csv
 
-# 🔑 Database Credentials
-DB_HOST = "tm01onboarding-tm01onboarding.e.aivencloud.com"
-DB_PORT = "13812"
-DB_NAME = "defaultdb"
-DB_USER = "avnadmin"
-DB_PASS = "AVNS_AFmtCZU-RoKIAHPUNUx"
-
-# Create SQLAlchemy engine
-DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-engine = create_engine(DATABASE_URL)
+# Shared engine; credentials come from configuration (see database.py)
+engine = get_engine()
 
 # Test connection
 try:
@@ -21,16 +14,19 @@ except Exception as e:
 
 # # Load CSV file
 csv_file = "malaysia_predicted_aqi.csv"
-df = pd.read_csv(csv_file)
 
 # # Define table name
 table_name = "air_quality"
 
-# # Upload to database
-df.to_sql(table_name, engine, if_exists="replace", index=False)
+# # Publish changed months into shadow partitions and swap them in atomically
+result = publish_forecast_csv(engine, csv_file)
 
-print(f"Data successfully uploaded to {table_name}!")
+print(
+    f"Published {len(result['published'])} month(s) to {table_name}, "
+    f"{len(result['unchanged'])} unchanged, {len(result['retired'])} retired."
+)
 
 query = f"SELECT * FROM {table_name} LIMIT 5;"
 df = pd.read_sql(query, engine)
-print(df)
\ No newline at end of file
+print(df)
+print(pool_stats(engine))
\ No newline at end of file